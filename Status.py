@@ -1,22 +1,67 @@
-def check_databases(self, treatment_name):
-    overall_status = 200
-    databases_response = {}
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.config import settings
+from app.core.health import HealthChecker
+
+# Pool dédié et borné : un thread bloqué par une base qui ne répond pas n'est
+# pas interrompu par le timeout, mais il n'occupe pas l'exécuteur par défaut
+# de la boucle et une même base n'a jamais plus d'une sonde en cours.
+_probe_executor = ThreadPoolExecutor(max_workers=settings.HEALTH_CHECK_THREADS, thread_name_prefix="db-health")
+
+
+class ProbeFailed(Exception):
+    pass
+
+
+def _db_probe(self, db_name, treatment_name, running: dict):
+    async def probe():
+        future = running.get(db_name)
+        if future is not None and not future.done():
+            raise ProbeFailed("Previous check still running")
+        future = running[db_name] = _probe_executor.submit(self.check, db_name, treatment_name)
+        db_health = await asyncio.wrap_future(future)
+        if db_health["status"] != 200:
+            raise ProbeFailed(db_health["response"].get("error", "Unknown error"))
+
+    return probe
 
-    for db_name in self.db_config:
-        if db_name == "iv2":
-            continue
 
-        db_health = self.check(db_name, treatment_name)
-        db_payload = db_health["response"]
+def _health_checker(self, treatment_name, timeout) -> HealthChecker:
+    """Un HealthChecker par (traitement, timeout) : son résultat est servi HEALTH_CHECK_TTL secondes"""
+    checkers = self.__dict__.setdefault("_health_checkers", {})
+    checker = checkers.get((treatment_name, timeout))
+    if checker is None:
+        checker = checkers[(treatment_name, timeout)] = HealthChecker(timeout, settings.HEALTH_CHECK_TTL)
+        running = {}
+        for db_name in self.db_config:
+            if db_name != "iv2":
+                checker.register(db_name, _db_probe(self, db_name, treatment_name, running))
+    return checker
 
+
+async def check_databases_async(self, treatment_name, timeout=5.0):
+    """Vérifie toutes les bases en parallèle, chacune bornée par timeout secondes.
+
+    self.check reste synchrone : chaque appel part dans le pool dédié. Une base
+    qui ne répond pas est déclarée Unhealthy à l'expiration du délai sans
+    retarder les autres ; la latence totale est celle de la base la plus lente,
+    plafonnée par timeout.
+    """
+    result = await _health_checker(self, treatment_name, timeout).check()
+
+    overall_status = 200
+    databases_response = {}
+
+    for db_name, check in result["checks"].items():
         databases_response[db_name] = {
-            "status": "Healthy" if db_health["status"] == 200 else "Unhealthy",
-            "response_time": db_payload.get("response_time"),
+            "status": "Healthy" if check["status"] == "healthy" else "Unhealthy",
+            "response_time": round(check["response_time_ms"] / 1000, 3),
         }
 
-        if db_health["status"] != 200:
+        if check["status"] != "healthy":
             overall_status = 503
-            databases_response[db_name]["error"] = db_payload.get("error", "Unknown error")
+            databases_response[db_name]["error"] = check.get("error", "Unknown error")
 
     return {
         "response": {
@@ -24,3 +69,8 @@ def check_databases(self, treatment_name):
         },
         "status": overall_status
     }
+
+
+def check_databases(self, treatment_name, timeout=5.0):
+    """Version synchrone, pour les appelants existants ; depuis une coroutine, utiliser check_databases_async"""
+    return asyncio.run(check_databases_async(self, treatment_name, timeout))
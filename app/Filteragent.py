@@ -1,11 +1,13 @@
-from core.llm import call_llm
+import asyncio
+import functools
+import hashlib
+import inspect
 import json
+import os
+import threading
+from collections import OrderedDict
 
-class TextFilterAgent:
-
-    def should_ingest(self, text: str) -> dict:
-        prompt = f"""
-You are a document ingestion filter for an Oracle RAG system.
+RULES = """You are a document ingestion filter for an Oracle RAG system.
 
 Decide if the following text contains useful Oracle technical knowledge.
 
@@ -13,11 +15,189 @@ Rules:
 - Accept only if technical and factual
 - Reject intros, images, marketing, TOC
 - Return JSON only
+"""
+
+DECISIONS = ("INGEST", "SKIP")
+
+# Les décisions en cache sont liées aux règles : les modifier invalide le cache
+RULES_VERSION = hashlib.sha256(RULES.encode()).hexdigest()[:12]
+
+
+class TextFilterAgent:
+    """Filtre d'ingestion : une décision INGEST/SKIP par extrait de texte.
+
+    Les extraits sont envoyés au LLM par lots (un prompt, une réponse en tableau
+    JSON indexé) ; filter_async traite plusieurs lots en parallèle, au plus
+    max_concurrency à la fois. Chaque décision est mémorisée par empreinte du
+    texte : réingérer un document inchangé ne coûte aucun appel. Avec
+    cache_path, le cache est aussi ajouté à un fichier JSON Lines et rechargé
+    au démarrage.
+
+    llm est une fonction prompt -> réponse, synchrone ou coroutine (par défaut
+    core.llm.call_llm, importé au premier appel) ; un stub local suffit pour
+    les tests.
+    """
+
+    def __init__(self, llm=None, batch_size: int = 20, max_batch_chars: int = 24000,
+                 max_concurrency: int = 4, cache_size: int = 100000, cache_path: str = None):
+        self._llm = llm
+        self.batch_size = batch_size
+        self.max_batch_chars = max_batch_chars
+        self.max_concurrency = max_concurrency
+        self.cache_size = cache_size
+        self.cache_path = cache_path
+        self.llm_calls = 0
+        self._decisions = OrderedDict()  # empreinte -> {"decision", "reason"}
+        self._file_lock = threading.Lock()
+        if cache_path and os.path.exists(cache_path):
+            self._load_cache()
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            from core.llm import call_llm
+            self._llm = call_llm
+        return self._llm
+
+    def should_ingest(self, text: str) -> dict:
+        return self.filter_batch([text])[0]
+
+    def filter_batch(self, texts: list[str]) -> list[dict]:
+        """Une décision par texte, dans l'ordre ; seuls les textes inconnus partent au LLM"""
+        keys = [self._key(text) for text in texts]
+        known, batches = self._plan(texts, keys)
+        for batch in batches:
+            decided = self._remember(batch, self._parse(self._call(self._prompt(batch)), batch))
+            self._persist(decided)
+            known.update(decided)
+        return [dict(known[key]) for key in keys]
 
-TEXT:
-{text}
+    async def filter_async(self, texts: list[str]) -> list[dict]:
+        """Comme filter_batch, avec au plus max_concurrency lots en cours"""
+        keys = [self._key(text) for text in texts]
+        known, batches = self._plan(texts, keys)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(batch):
+            async with semaphore:
+                reply = await self._acall(self._prompt(batch))
+            decided = self._remember(batch, self._parse(reply, batch))
+            if self.cache_path:
+                await asyncio.to_thread(self._persist, decided)  # pas d'écriture disque dans la boucle
+            known.update(decided)
+
+        await asyncio.gather(*(run(batch) for batch in batches))
+        return [dict(known[key]) for key in keys]
+
+    @staticmethod
+    def _key(text: str) -> str:
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{RULES_VERSION}:{normalized}".encode()).hexdigest()
+
+    def _plan(self, texts, keys) -> tuple[dict, list[list[tuple[str, str]]]]:
+        """Décisions déjà en cache, et lots de (empreinte, texte) à soumettre.
+
+        Les lots sont sans doublon et bornés en nombre d'extraits et en taille.
+        """
+        known, batches, batch, size, seen = {}, [], [], 0, set()
+        for key, text in zip(keys, texts):
+            if key in seen or key in known:
+                continue
+            decision = self._decisions.get(key)
+            if decision is not None:
+                self._decisions.move_to_end(key)
+                known[key] = decision
+                continue
+            seen.add(key)
+            if batch and (len(batch) >= self.batch_size or size + len(text) > self.max_batch_chars):
+                batches.append(batch)
+                batch, size = [], 0
+            batch.append((key, text))
+            size += len(text)
+        if batch:
+            batches.append(batch)
+        return known, batches
+
+    @staticmethod
+    def _prompt(batch) -> str:
+        items = json.dumps([{"index": index, "text": text} for index, (_, text) in enumerate(batch)],
+                           ensure_ascii=False)
+        return f"""{RULES}
+Apply the rules to EACH text of the JSON array below, independently.
+
+TEXTS:
+{items}
 
 OUTPUT:
-{{"decision":"INGEST|SKIP","reason":""}}
+A JSON array with exactly one object per text, same "index":
+[{{"index":0,"decision":"INGEST|SKIP","reason":""}}]
 """
-        return json.loads(call_llm(prompt))
+
+    def _call(self, prompt: str) -> str:
+        self.llm_calls += 1
+        reply = self.llm(prompt)
+        if inspect.isawaitable(reply):
+            raise TypeError("Asynchronous llm: use filter_async")
+        return reply
+
+    async def _acall(self, prompt: str) -> str:
+        """Un llm asynchrone est appelé dans la boucle, un llm synchrone dans un thread"""
+        self.llm_calls += 1
+        if self._is_async(self.llm):
+            reply = self.llm(prompt)
+        else:
+            reply = await asyncio.to_thread(self.llm, prompt)
+        if inspect.isawaitable(reply):  # llm non reconnu comme asynchrone mais qui retourne une coroutine
+            reply = await reply
+        return reply
+
+    @staticmethod
+    def _is_async(llm) -> bool:
+        while isinstance(llm, functools.partial):
+            llm = llm.func
+        return inspect.iscoroutinefunction(llm) or inspect.iscoroutinefunction(getattr(llm, "__call__", None))
+
+    @staticmethod
+    def _parse(reply: str, batch) -> list[dict]:
+        """Décisions du lot, dans l'ordre du lot ; ValueError si la réponse est incomplète"""
+        start, end = reply.find("["), reply.rfind("]")
+        if start < 0 or end < start:
+            raise ValueError(f"LLM reply is not a JSON array: {reply[:200]!r}")
+        decisions = {}
+        for item in json.loads(reply[start:end + 1]):
+            decision = str(item.get("decision", "")).strip().upper()
+            if decision in DECISIONS and isinstance(item.get("index"), int):
+                decisions[item["index"]] = {"decision": decision, "reason": str(item.get("reason", ""))}
+        missing = [index for index in range(len(batch)) if index not in decisions]
+        if missing:
+            raise ValueError(f"LLM reply has no valid decision for items {missing}")
+        return [decisions[index] for index in range(len(batch))]
+
+    def _remember(self, batch, decisions: list[dict]) -> dict:
+        decided = {key: decision for (key, _), decision in zip(batch, decisions)}
+        for key, decision in decided.items():
+            self._store(key, decision)
+        return decided
+
+    def _persist(self, decided: dict):
+        """Ajoute les décisions au fichier cache_path (un lot à la fois)"""
+        if not self.cache_path:
+            return
+        lines = "".join(json.dumps({"key": key, **decision}) + "\n" for key, decision in decided.items())
+        with self._file_lock, open(self.cache_path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def _store(self, key: str, decision: dict):
+        self._decisions[key] = decision
+        self._decisions.move_to_end(key)
+        while len(self._decisions) > self.cache_size:
+            self._decisions.popitem(last=False)
+
+    def _load_cache(self):
+        with open(self.cache_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # dernière ligne tronquée par un arrêt brutal
+                self._store(entry.pop("key"), entry)
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+RETRIEVAL = "retrieval"
+ANSWER = "answer"
+
+
+def normalize_question(question: str) -> str:
+    """Casse, ponctuation et espaces ignorés : deux formulations identiques au mot près partagent l'entrée"""
+    return " ".join(_PUNCTUATION.sub(" ", question.lower()).split())
+
+
+def _digest(*parts) -> str:
+    return hashlib.blake2b("\x1f".join(map(str, parts)).encode(), digest_size=20).hexdigest()
+
+
+def oracle_corpus_version(connection, table: str = "oracle_rag_docs") -> str:
+    """Empreinte de la table des extraits : nombre de lignes, id maximal et somme des hachages ORA_HASH"""
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT COUNT(*), MAX(id), SUM(ORA_HASH(DBMS_LOB.SUBSTR(content, 4000, 1))) FROM {table}")
+    return _digest(table, *cursor.fetchone())
+
+
+def local_corpus_version(store) -> str:
+    """Empreinte d'un LocalVectorStore : nombre de lignes et date de modification de meta.json"""
+    return _digest(store.directory, store.count, os.stat(os.path.join(store.directory, "meta.json")).st_mtime_ns)
+
+
+class RagCache:
+    """Cache à deux niveaux du chemin RAG, persistant dans un fichier SQLite.
+
+    - retrieval : question normalisée (+ paramètres de recherche) -> id des extraits ;
+    - answer : (empreinte de la première réponse, id des extraits du contexte)
+      -> réponse affinée.
+
+    Chaque entrée expire après ttl secondes ; au-delà de max_entries, les
+    entrées les moins récemment lues sont évincées. Le cache est lié à une
+    version du corpus (corpus_version, ou la fonction version_provider
+    consultée au plus toutes les check_interval secondes) : quand elle change,
+    toutes les entrées sont supprimées, aucune réponse calculée sur l'ancien
+    contenu de rag_chunks / oracle_rag_docs n'est servie.
+    """
+
+    def __init__(self, path: str = ":memory:", max_entries: int = 10000, ttl: float = 7 * 86400,
+                 corpus_version: str = None, version_provider=None, check_interval: float = 60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version_provider = version_provider
+        self.check_interval = check_interval
+        self.hits = {RETRIEVAL: 0, ANSWER: 0}
+        self.misses = {RETRIEVAL: 0, ANSWER: 0}
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS entries (level TEXT NOT NULL, key TEXT NOT NULL, "
+                          "value TEXT NOT NULL, expires REAL NOT NULL, used REAL NOT NULL, "
+                          "PRIMARY KEY (level, key))")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries (used)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._count = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        row = self.conn.execute("SELECT value FROM meta WHERE name = 'corpus_version'").fetchone()
+        self.corpus_version = row[0] if row else None
+        if corpus_version is not None:
+            self.set_corpus_version(corpus_version)
+
+    # ------------------------------------------------------------------
+    # Version du corpus
+    # ------------------------------------------------------------------
+
+    def set_corpus_version(self, version: str):
+        """Vide le cache si le corpus a changé depuis la dernière version enregistrée"""
+        with self._lock:
+            if version == self.corpus_version:
+                return
+            self.conn.execute("BEGIN")
+            self.conn.execute("DELETE FROM entries")
+            self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('corpus_version', ?)", (version,))
+            self.conn.execute("COMMIT")
+            self.corpus_version = version
+            self._count = 0
+
+    def _check_version(self):
+        if self.version_provider is None:
+            return
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval:
+            self._checked = now
+            self.set_corpus_version(self.version_provider())
+
+    # ------------------------------------------------------------------
+    # Accès génériques
+    # ------------------------------------------------------------------
+
+    def get(self, level: str, key: str):
+        self._check_version()
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute("SELECT value, expires FROM entries WHERE level = ? AND key = ?",
+                                    (level, key)).fetchone()
+            if row is None or row[1] <= now:
+                if row is not None:
+                    self.conn.execute("DELETE FROM entries WHERE level = ? AND key = ?", (level, key))
+                    self._count -= 1
+                self.misses[level] += 1
+                return None
+            self.conn.execute("UPDATE entries SET used = ? WHERE level = ? AND key = ?", (now, level, key))
+            self.hits[level] += 1
+        return json.loads(row[0])
+
+    def set(self, level: str, key: str, value, ttl: float = None):
+        self._check_version()
+        now = time.time()
+        with self._lock:
+            updated = self.conn.execute(
+                "INSERT INTO entries (level, key, value, expires, used) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (level, key) DO UPDATE SET value = excluded.value, "
+                "expires = excluded.expires, used = excluded.used",
+                (level, key, json.dumps(value), now + (ttl or self.ttl), now)).rowcount
+            self._count += updated  # compte par excès (une mise à jour compte 1), recalculé à l'éviction
+            if self._count > self.max_entries:
+                self._evict(now)
+
+    def _evict(self, now: float):
+        """Supprime les entrées expirées puis les moins récemment lues, jusqu'à 90 % de max_entries"""
+        self.conn.execute("DELETE FROM entries WHERE expires <= ?", (now,))
+        self._count = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        excess = self._count - int(self.max_entries * 0.9)
+        if excess > 0:
+            self.conn.execute("DELETE FROM entries WHERE rowid IN "
+                              "(SELECT rowid FROM entries ORDER BY used LIMIT ?)", (excess,))
+            self._count -= excess
+
+    # ------------------------------------------------------------------
+    # Niveaux
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def retrieval_key(question: str, **params) -> str:
+        return _digest(normalize_question(question), json.dumps(params, sort_keys=True))
+
+    @staticmethod
+    def answer_key(first_answer: str, chunk_ids, **params) -> str:
+        return _digest(_digest(first_answer.strip()), ",".join(map(str, chunk_ids)),
+                       json.dumps(params, sort_keys=True))
+
+    def get_retrieval(self, question: str, **params):
+        return self.get(RETRIEVAL, self.retrieval_key(question, **params))
+
+    def put_retrieval(self, question: str, chunk_ids, **params):
+        self.set(RETRIEVAL, self.retrieval_key(question, **params), list(chunk_ids))
+
+    def get_answer(self, first_answer: str, chunk_ids, **params):
+        return self.get(ANSWER, self.answer_key(first_answer, chunk_ids, **params))
+
+    def put_answer(self, first_answer: str, chunk_ids, answer: str, **params):
+        self.set(ANSWER, self.answer_key(first_answer, chunk_ids, **params), answer)
+
+    def stats(self) -> dict:
+        return {"entries": self._count, "corpus_version": self.corpus_version,
+                "hits": dict(self.hits), "misses": dict(self.misses)}
+
+    def close(self):
+        self.conn.close()
+
+
+def cached_search(cache: RagCache, store, question: str, embed, topic: str, top_k: int, **filters) -> list[dict]:
+    """Recherche vectorielle par la question, servie depuis le cache retrieval si possible.
+
+    Sur un hit, ni embedding ni recherche : les extraits sont relus par id
+    (store.fetch, ex. LocalVectorStore). embed est la fonction question -> embedding.
+    """
+    ids = cache.get_retrieval(question, topic=topic, top_k=top_k, **filters)
+    if ids is not None:
+        docs = store.fetch(ids)
+        if all(doc_id in docs for doc_id in ids):
+            return [docs[doc_id] for doc_id in ids]
+    results = store.vector_search(topic, embed(question), top_k, **filters)
+    cache.put_retrieval(question, [doc["id"] for doc in results], topic=topic, top_k=top_k, **filters)
+    return results
@@ -1,10 +1,116 @@
-from core.llm import call_llm
+import hashlib
+import logging
+import re
+import time
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+_tokenizer = None
+
+
+def _default_tokenizer():
+    """tiktoken (cl100k_base) s'il est installé, sinon estimation à 4 caractères par token"""
+    global _tokenizer
+    if _tokenizer is None:
+        try:
+            import tiktoken
+
+            encoding = tiktoken.get_encoding("cl100k_base")
+            _tokenizer = lambda text: len(encoding.encode(text, disallowed_special=()))
+        except ImportError:
+            _tokenizer = lambda text: (len(text) + 3) // 4
+    return _tokenizer
+
+
+class ContextAssembler:
+    """Construit le RAG_CONTEXT à partir d'extraits classés, dans un budget de tokens.
+
+    Les extraits arrivent du plus pertinent au moins pertinent. Les doublons
+    exacts (empreinte du texte normalisé) et les quasi-doublons (similarité de
+    Jaccard des shingles de mots >= similarity) d'un extrait déjà retenu sont
+    écartés, puis les extraits sont retenus dans l'ordre tant qu'ils tiennent
+    dans le budget ; un extrait trop long est sauté au profit des suivants.
+    Le nombre de tokens d'un texte est mis en cache : un extrait qui revient
+    d'une question à l'autre n'est compté qu'une fois.
+    """
+
+    separator = "\n\n---\n\n"
+
+    def __init__(self, tokenizer=None, shingle_size: int = 5, similarity: float = 0.8,
+                 cache_size: int = 10000):
+        self.shingle_size = shingle_size
+        self.similarity = similarity
+        self.count_tokens = lru_cache(maxsize=cache_size)(tokenizer or _default_tokenizer())
+        self.separator_tokens = self.count_tokens(self.separator)
+
+    @staticmethod
+    def _text(chunk) -> str:
+        return chunk if isinstance(chunk, str) else chunk["content"]
+
+    def _shingles(self, words: list[str]) -> set:
+        if len(words) <= self.shingle_size:
+            return {tuple(words)}
+        return {tuple(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def assemble(self, chunks, token_budget: int) -> tuple[str, dict]:
+        """(contexte, statistiques) ; le contexte compte au plus token_budget tokens"""
+        started = time.perf_counter()
+        kept, kept_shingles, seen = [], [], set()
+        tokens = duplicates = skipped = 0
+
+        for chunk in chunks:
+            text = self._text(chunk).strip()
+            words = _WORD.findall(text.lower())
+            digest = hashlib.blake2b(" ".join(words).encode(), digest_size=16).digest()
+            if not words or digest in seen:
+                duplicates += 1
+                continue
+            seen.add(digest)
+            shingles = self._shingles(words)
+            if any(len(shingles & other) / len(shingles | other) >= self.similarity for other in kept_shingles):
+                duplicates += 1
+                continue
+
+            cost = self.count_tokens(text) + (self.separator_tokens if kept else 0)
+            if tokens + cost > token_budget:
+                skipped += 1
+                continue
+            kept.append(text if isinstance(chunk, str) else self._format(chunk, text))
+            kept_shingles.append(shingles)
+            tokens += cost
+
+        stats = {
+            "chunks": len(kept),
+            "duplicates": duplicates,
+            "over_budget": skipped,
+            "context_tokens": tokens,
+            "assembly_ms": (time.perf_counter() - started) * 1000,
+        }
+        return self.separator.join(kept), stats
+
+    @staticmethod
+    def _format(chunk: dict, text: str) -> str:
+        source = chunk.get("source")
+        return f"[{source}]\n{text}" if source else text
+
 
 class FinalAnswerAgent:
+    """Affinage de la première réponse par le contexte RAG.
+
+    Le bloc d'instructions, identique d'un appel à l'autre, ouvre le prompt
+    (PREFIX, compté une seule fois) : les LLM qui mettent en cache les préfixes
+    de prompt ne le retraitent pas. Le contexte est assemblé dans ce qui reste
+    de max_prompt_tokens une fois le préfixe et la première réponse comptés.
+    Les statistiques du dernier appel sont dans last_stats.
 
-    def refine(self, assistant_first_answer: str, rag_context: str) -> str:
-        prompt = f"""
-You are a senior Oracle performance tuning expert.
+    Avec cache (Ragcache.RagCache), la réponse affinée est mémorisée par
+    (première réponse, id des extraits) : une question déjà traitée sur le
+    même contexte ne rappelle pas le LLM.
+    """
+
+    PREFIX = """You are a senior Oracle performance tuning expert.
 
 TASK:
 Refine and validate the initial assistant answer using ONLY the RAG context.
@@ -18,13 +124,60 @@ RULES:
 - If RAG_CONTEXT is insufficient, explicitly say it
 - Be precise, technical, concise
 
-FIRST_ASSISTANT_ANSWER:
-{assistant_first_answer}
-
-RAG_CONTEXT:
-{rag_context}
-
 OUTPUT:
 Return the final improved answer (no JSON).
 """
-        return call_llm(prompt).strip()
+
+    def __init__(self, llm=None, assembler: ContextAssembler = None, max_prompt_tokens: int = 6000,
+                 cache=None):
+        self._llm = llm
+        self.cache = cache
+        self.assembler = assembler or ContextAssembler()
+        self.max_prompt_tokens = max_prompt_tokens
+        self.prefix_tokens = self.assembler.count_tokens(self.PREFIX)
+        self.last_stats = None
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            from core.llm import call_llm
+            self._llm = call_llm
+        return self._llm
+
+    def build_prompt(self, assistant_first_answer: str, rag_context) -> str:
+        """rag_context : extraits classés (textes ou dicts avec content/source) ou texte brut"""
+        if isinstance(rag_context, str):
+            rag_context = [part for part in rag_context.split("\n\n") if part.strip()]
+
+        head = f"{self.PREFIX}\nFIRST_ASSISTANT_ANSWER:\n{assistant_first_answer}\n\nRAG_CONTEXT:\n"
+        head_tokens = self.prefix_tokens + self.assembler.count_tokens(head[len(self.PREFIX):])
+        context, stats = self.assembler.assemble(rag_context, max(0, self.max_prompt_tokens - head_tokens))
+
+        stats["prompt_tokens"] = head_tokens + stats["context_tokens"]
+        self.last_stats = stats
+        logger.debug("RAG prompt: %(prompt_tokens)d tokens, %(chunks)d chunks "
+                     "(%(duplicates)d duplicates, %(over_budget)d over budget), assembled in %(assembly_ms).1f ms",
+                     stats)
+        return head + context
+
+    @staticmethod
+    def chunk_ids(rag_context) -> list[str]:
+        """Identifiants des extraits : leur id s'il est fourni, sinon l'empreinte du texte"""
+        if isinstance(rag_context, str):
+            return [hashlib.blake2b(rag_context.encode(), digest_size=16).hexdigest()]
+        return [str(chunk["id"]) if isinstance(chunk, dict) and "id" in chunk
+                else hashlib.blake2b(ContextAssembler._text(chunk).encode(), digest_size=16).hexdigest()
+                for chunk in rag_context]
+
+    def refine(self, assistant_first_answer: str, rag_context) -> str:
+        if self.cache is None:
+            return self.llm(self.build_prompt(assistant_first_answer, rag_context)).strip()
+
+        if not isinstance(rag_context, str):
+            rag_context = list(rag_context)
+        ids = self.chunk_ids(rag_context)
+        answer = self.cache.get_answer(assistant_first_answer, ids, max_prompt_tokens=self.max_prompt_tokens)
+        if answer is None:
+            answer = self.llm(self.build_prompt(assistant_first_answer, rag_context)).strip()
+            self.cache.put_answer(assistant_first_answer, ids, answer, max_prompt_tokens=self.max_prompt_tokens)
+        return answer
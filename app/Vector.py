@@ -1,16 +1,152 @@
-import oracledb
+import os
+import sqlite3
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
 
-conn = oracledb.connect(user="user", password="pwd", dsn="dsn")
-cursor = conn.cursor()
 
-# vec = list[float] de ton embedding
-arr = conn.arrayvar(oracledb.DB_TYPE_BINARY_FLOAT, vec)
+def as_float32(embedding) -> array:
+    """Embedding (liste, tuple, tableau NumPy...) converti en array('f')"""
+    if isinstance(embedding, array) and embedding.typecode == "f":
+        return embedding
+    if hasattr(embedding, "astype"):  # NumPy : copie mémoire, sans boucle Python
+        vector = array("f")
+        vector.frombytes(embedding.astype("float32", copy=False).tobytes())
+        return vector
+    return array("f", embedding)
 
-cursor.execute("""
-    BEGIN
-        INSERT INTO rag_chunks (content, embedding)
-        VALUES (:1, :2);
-    END;
-""", [content, arr])
 
-conn.commit()
+class OracleVectorBackend:
+    """Table Oracle (content, embedding VECTOR) alimentée par INSERT liés en tableau.
+
+    Un lot = un executemany (un aller-retour) et un commit, sur une connexion
+    prise dans le pool ; le pool permet d'écrire plusieurs lots en parallèle.
+    """
+
+    def __init__(self, user: str, password: str, dsn: str, table: str = "rag_chunks",
+                 pool_min: int = 1, pool_max: int = 4):
+        import oracledb
+
+        self.oracledb = oracledb
+        self.pool = oracledb.create_pool(user=user, password=password, dsn=dsn,
+                                         min=pool_min, max=pool_max, increment=1)
+        self.statement = f"INSERT INTO {table} (content, embedding) VALUES (:1, :2)"
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        return cls(os.environ["ORACLE_USER"], os.environ["ORACLE_PASSWORD"], os.environ["ORACLE_DSN"], **kwargs)
+
+    def insert_batch(self, rows: list[tuple[str, array]]):
+        with self.pool.acquire() as conn:
+            cursor = conn.cursor()
+            # LONG : textes au-delà de 4000 octets vers une colonne CLOB, sans LOB temporaire
+            cursor.setinputsizes(self.oracledb.DB_TYPE_LONG, self.oracledb.DB_TYPE_VECTOR)
+            cursor.executemany(self.statement, rows)
+            conn.commit()
+
+    def close(self):
+        self.pool.close()
+
+
+class SQLiteVectorBackend:
+    """Stand-in local : embeddings float32 stockés en BLOB, relus en matrice NumPy.
+
+    La connexion est partagée par les threads de VectorStoreWriter : un verrou
+    sérialise les transactions (SQLite n'a de toute façon qu'un écrivain).
+    """
+
+    def __init__(self, path: str = ":memory:", table: str = "rag_chunks"):
+        self.table = table
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS {table} "
+                          f"(id INTEGER PRIMARY KEY, content TEXT, embedding BLOB)")
+        self.statement = f"INSERT INTO {table} (content, embedding) VALUES (?, ?)"
+
+    def insert_batch(self, rows: list[tuple[str, array]]):
+        with self._lock, self.conn:
+            self.conn.executemany(self.statement, ((content, vector.tobytes()) for content, vector in rows))
+
+    def fetch(self):
+        """(contenus, matrice float32 n x dimensions)"""
+        import numpy as np
+
+        with self._lock:
+            rows = self.conn.execute(f"SELECT content, embedding FROM {self.table} ORDER BY id").fetchall()
+        contents = [content for content, _ in rows]
+        if not rows:
+            return contents, np.empty((0, 0), dtype=np.float32)
+        return contents, np.frombuffer(b"".join(blob for _, blob in rows), dtype=np.float32).reshape(len(rows), -1)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class VectorStoreWriter:
+    """Écriture en flux de (contenu, embedding) par lots de batch_size.
+
+    write() consomme un itérable de longueur quelconque sans le matérialiser :
+    seuls les lots en cours d'écriture sont en mémoire. Avec concurrency > 1,
+    les lots sont envoyés en parallèle depuis des threads (le pool Oracle
+    fournit une connexion à chacun). Chaque lot est validé séparément : après
+    une erreur, les lots déjà écrits restent en base.
+    """
+
+    def __init__(self, backend, batch_size: int = 1000, concurrency: int = 1, dimensions: int = None):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.dimensions = dimensions
+        self.written = 0
+
+    def _batches(self, rows):
+        rows = iter(rows)
+        while batch := list(islice(rows, self.batch_size)):
+            prepared = []
+            for content, embedding in batch:
+                vector = as_float32(embedding)
+                if self.dimensions is None:
+                    self.dimensions = len(vector)
+                elif len(vector) != self.dimensions:
+                    raise ValueError(f"Embedding has {len(vector)} dimensions, expected {self.dimensions}")
+                prepared.append((content, vector))
+            yield prepared
+
+    def write(self, rows) -> int:
+        """Écrit tout l'itérable et retourne le nombre de lignes écrites par cet appel"""
+        before = self.written
+        if self.concurrency <= 1:
+            for batch in self._batches(rows):
+                self.backend.insert_batch(batch)
+                self.written += len(batch)
+            return self.written - before
+
+        with ThreadPoolExecutor(self.concurrency) as executor:
+            pending = {}
+            try:
+                for batch in self._batches(rows):
+                    if len(pending) >= self.concurrency:
+                        self._collect(pending, wait(pending, return_when=FIRST_COMPLETED).done)
+                    pending[executor.submit(self.backend.insert_batch, batch)] = len(batch)
+                self._collect(pending, wait(pending).done)
+            finally:
+                for future in pending:
+                    future.cancel()
+        return self.written - before
+
+    def _collect(self, pending: dict, done):
+        for future in done:
+            size = pending.pop(future)
+            future.result()  # propage l'erreur d'insertion
+            self.written += size
+
+    def close(self):
+        self.backend.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,309 @@
+import json
+import os
+import sqlite3
+
+import numpy as np
+
+BLOCK_ROWS = 65536  # lignes de la matrice multipliées à la fois : mémoire bornée
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class LocalVectorStore:
+    """Index vectoriel en processus, même interface que OracleVectorStore.
+
+    Remplace la table oracle_rag_docs et son VECTOR INDEX (NEIGHBOR PARTITIONS,
+    DISTANCE COSINE) pour servir ou tester le RAG sans Oracle 23ai. Dans
+    `directory` :
+
+    - vectors.f32 : matrice float32 normalisée (n x dimensions), lue par memmap ;
+    - topic.i32, source.i32 : codes des colonnes filtrables, en mémoire ;
+    - ids.i64 : id du document de chaque ligne (l'ordre change avec l'IVF) ;
+    - docs.db : contenu et métadonnées (SQLite), lus pour les seuls résultats ;
+    - meta.json : dimensions, nombre de lignes, vocabulaires, partitions IVF.
+
+    La recherche exacte est un produit matriciel par blocs (similarité cosinus,
+    top-k par argpartition), pour plusieurs requêtes à la fois. Après
+    build_ivf, les lignes sont regroupées par partition (k-means sphérique) :
+    une requête ne lit que les nprobe partitions les plus proches, contiguës
+    sur disque, plus les lignes ajoutées depuis la construction.
+    """
+
+    def __init__(self, directory: str, dimensions: int = 384, nprobe: int = 8):
+        self.directory = directory
+        self.nprobe = nprobe
+        os.makedirs(directory, exist_ok=True)
+        self.docs = sqlite3.connect(self._path("docs.db"), check_same_thread=False)
+        self.docs.execute("CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, topic TEXT NOT NULL, "
+                          "sub_topics TEXT, source TEXT NOT NULL, content TEXT NOT NULL)")
+
+        meta = {"dimensions": dimensions, "count": 0, "topics": [], "sources": [], "ivf": None}
+        if os.path.exists(self._path("meta.json")):
+            with open(self._path("meta.json")) as f:
+                meta = json.load(f)
+        self.dimensions = meta["dimensions"]
+        self.count = meta["count"]
+        self.topics = meta["topics"]
+        self.sources = meta["sources"]
+        self.ivf = meta["ivf"]  # {"count": lignes partitionnées, "offsets": [...]} ou None
+        self._topic_codes = {topic: code for code, topic in enumerate(self.topics)}
+        self._source_codes = {source: code for code, source in enumerate(self.sources)}
+
+        # Un arrêt pendant un ajout peut laisser des lignes au-delà de count
+        with self.docs:
+            self.docs.execute("DELETE FROM docs WHERE id >= ?", (self.count,))
+        self._truncate("vectors.f32", self.count * self.dimensions * 4)
+        self._truncate("topic.i32", self.count * 4)
+        self._truncate("source.i32", self.count * 4)
+        self._truncate("ids.i64", self.count * 8)
+        self.topic = self._load("topic.i32", np.int32)
+        self.source = self._load("source.i32", np.int32)
+        self.ids = self._load("ids.i64", np.int64)
+        self.centroids = np.load(self._path("centroids.npy")) if self.ivf else None
+        self._vectors = None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _truncate(self, name: str, size: int):
+        path = self._path(name)
+        if os.path.exists(path) and os.path.getsize(path) > size:
+            os.truncate(path, size)
+
+    def _load(self, name: str, dtype) -> np.ndarray:
+        path = self._path(name)
+        return np.fromfile(path, dtype=dtype) if os.path.exists(path) else np.empty(0, dtype=dtype)
+
+    def _save_meta(self):
+        tmp = self._path("meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"dimensions": self.dimensions, "count": self.count, "topics": self.topics,
+                       "sources": self.sources, "ivf": self.ivf}, f)
+        os.replace(tmp, self._path("meta.json"))
+
+    @property
+    def vectors(self) -> np.ndarray:
+        if self._vectors is None:
+            if self.count == 0:
+                return np.empty((0, self.dimensions), dtype=np.float32)
+            self._vectors = np.memmap(self._path("vectors.f32"), dtype=np.float32, mode="r",
+                                      shape=(self.count, self.dimensions))
+        return self._vectors
+
+    def _code(self, codes: dict, vocabulary: list, value: str) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(vocabulary)
+            vocabulary.append(value)
+        return code
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+
+    def insert_doc(self, topic, sub_topics, source, content, embedding) -> int:
+        return self.insert_docs([(topic, sub_topics, source, content, embedding)])[0]
+
+    def insert_docs(self, docs) -> list[int]:
+        """Ajoute des (topic, sub_topics, source, content, embedding) ; retourne leurs id"""
+        docs = list(docs)
+        if not docs:
+            return []
+        vectors = _normalize([doc[4] for doc in docs])
+        if vectors.shape[1] != self.dimensions:
+            raise ValueError(f"Embeddings have {vectors.shape[1]} dimensions, expected {self.dimensions}")
+        first = self.count
+        ids = np.arange(first, first + len(docs), dtype=np.int64)
+        topic = np.array([self._code(self._topic_codes, self.topics, doc[0]) for doc in docs], dtype=np.int32)
+        source = np.array([self._code(self._source_codes, self.sources, doc[2]) for doc in docs], dtype=np.int32)
+
+        with self.docs:
+            self.docs.executemany("INSERT INTO docs (id, topic, sub_topics, source, content) VALUES (?, ?, ?, ?, ?)", [
+                (int(doc_id), doc[0], ",".join(doc[1]) if isinstance(doc[1], (list, tuple)) else doc[1],
+                 doc[2], doc[3])
+                for doc_id, doc in zip(ids, docs)])
+        for name, values in (("vectors.f32", vectors), ("topic.i32", topic),
+                             ("source.i32", source), ("ids.i64", ids)):
+            with open(self._path(name), "ab") as f:
+                values.tofile(f)
+
+        self.topic = np.concatenate([self.topic, topic])
+        self.source = np.concatenate([self.source, source])
+        self.ids = np.concatenate([self.ids, ids])
+        self.count += len(docs)
+        self._vectors = None
+        self._save_meta()
+        return ids.tolist()
+
+    # ------------------------------------------------------------------
+    # Partitionnement (IVF)
+    # ------------------------------------------------------------------
+
+    def build_ivf(self, nlist: int = None, iterations: int = 10, sample_size: int = 100000, seed: int = 0):
+        """Regroupe les lignes en nlist partitions (par défaut ~4·√n) par k-means sphérique"""
+        if self.count == 0:
+            return
+        rng = np.random.default_rng(seed)
+        nlist = min(self.count, nlist or max(1, int(4 * np.sqrt(self.count))))
+        sample = self.vectors[np.sort(rng.choice(self.count, min(self.count, sample_size), replace=False))]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = self._nearest(sample, centroids)
+            order = np.argsort(assign, kind="stable")
+            counts = np.bincount(assign, minlength=nlist)
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            sums = np.add.reduceat(sample[order], starts[counts > 0], axis=0)
+            centroids[counts > 0] = _normalize(sums)
+            empty = np.flatnonzero(counts == 0)  # partition vide : repart d'un point au hasard
+            centroids[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+
+        assign = np.concatenate([self._nearest(self.vectors[start:start + BLOCK_ROWS], centroids)
+                                 for start in range(0, self.count, BLOCK_ROWS)])
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=nlist)
+
+        # Réécrit la matrice dans l'ordre des partitions : chaque partition est contiguë
+        tmp = self._path("vectors.f32.tmp")
+        with open(tmp, "wb") as f:
+            for start in range(0, self.count, BLOCK_ROWS):
+                self.vectors[order[start:start + BLOCK_ROWS]].tofile(f)
+        self._vectors = None
+        os.replace(tmp, self._path("vectors.f32"))
+        self.topic, self.source, self.ids = self.topic[order], self.source[order], self.ids[order]
+        for name, values in (("topic.i32", self.topic), ("source.i32", self.source), ("ids.i64", self.ids)):
+            values.tofile(self._path(name))
+        np.save(self._path("centroids.npy"), centroids)
+        self.centroids = centroids
+        self.ivf = {"count": self.count, "offsets": np.concatenate([[0], np.cumsum(counts)]).tolist()}
+        self._save_meta()
+
+    @staticmethod
+    def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ centroids.T, axis=1)
+
+    # ------------------------------------------------------------------
+    # Recherche
+    # ------------------------------------------------------------------
+
+    def _mask(self, topic=None, source=None):
+        """Lignes retenues par les filtres (None : toutes) ; False si une valeur est inconnue"""
+        mask = None
+        for column, codes, value in ((self.topic, self._topic_codes, topic),
+                                     (self.source, self._source_codes, source)):
+            if value is None:
+                continue
+            if value not in codes:
+                return False
+            selected = column == codes[value]
+            mask = selected if mask is None else mask & selected
+        return mask
+
+    def _candidates(self, query_vectors: np.ndarray, nprobe: int) -> list[tuple[int, int]]:
+        """Plages de lignes à parcourir : partitions les plus proches des requêtes et lignes récentes.
+
+        Les partitions vides (embeddings en double, centroïdes ex æquo) sont
+        ignorées : chaque requête sonde nprobe partitions non vides.
+        """
+        offsets = np.asarray(self.ivf["offsets"])
+        live = np.flatnonzero(np.diff(offsets) > 0)
+        probes = live[np.argsort(-(query_vectors @ self.centroids[live].T), axis=1)[:, :nprobe]]
+        ranges = [(int(offsets[p]), int(offsets[p + 1])) for p in np.unique(probes)]
+        if self.ivf["count"] < self.count:
+            ranges.append((self.ivf["count"], self.count))
+        return ranges
+
+    def search(self, embeddings, top_k: int = 5, topic: str = None, source: str = None,
+               nprobe: int = None, exact: bool = False) -> list[list[tuple[int, float]]]:
+        """(id, similarité cosinus) des top_k plus proches voisins de chaque embedding"""
+        queries = _normalize(np.atleast_2d(embeddings))
+        mask = self._mask(topic, source)
+        if mask is False or self.count == 0 or top_k <= 0:
+            return [[] for _ in queries]
+
+        candidates = [(0, self.count)]
+        if self.ivf and not exact:
+            candidates = self._candidates(queries, nprobe or self.nprobe)
+        if mask is not None:
+            candidates = np.concatenate([np.arange(start, end) for start, end in candidates] or
+                                        [np.empty(0, dtype=np.int64)])
+            candidates = candidates[mask[candidates]]
+            if len(candidates) < top_k:  # filtre trop sélectif pour les partitions sondées
+                candidates = np.flatnonzero(mask)
+        elif sum(end - start for start, end in candidates) < top_k:
+            candidates = [(0, self.count)]
+        return self._top_k(queries, candidates, top_k)
+
+    def _blocks(self, candidates):
+        """(positions, vecteurs) par blocs : tranches du memmap pour des plages, copies sinon"""
+        if isinstance(candidates, np.ndarray):
+            for block in range(0, len(candidates), BLOCK_ROWS):
+                positions = candidates[block:block + BLOCK_ROWS]
+                yield positions, self.vectors[positions]
+            return
+        for start, end in candidates:
+            for block in range(start, end, BLOCK_ROWS):
+                stop = min(block + BLOCK_ROWS, end)
+                yield np.arange(block, stop), self.vectors[block:stop]
+
+    def _top_k(self, queries: np.ndarray, candidates, top_k: int):
+        """Top-k exact sur les lignes candidates (tableau de positions ou plages (début, fin))"""
+        blocks = self._blocks(candidates)
+
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_positions = np.empty((len(queries), 0), dtype=np.int64)
+        for chunk, vectors in blocks:
+            scores = queries @ vectors.T  # (requêtes x lignes du bloc)
+            if scores.shape[1] > top_k:
+                keep = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+                scores = np.take_along_axis(scores, keep, axis=1)
+                chunk = chunk[keep]
+            else:
+                chunk = np.broadcast_to(chunk, scores.shape)
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+            best_positions = np.concatenate([best_positions, chunk], axis=1)
+            if best_scores.shape[1] > top_k:
+                keep = np.argpartition(-best_scores, top_k - 1, axis=1)[:, :top_k]
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                best_positions = np.take_along_axis(best_positions, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_ids = self.ids[np.take_along_axis(best_positions, order, axis=1)]
+        return [[(int(doc_id), float(score)) for doc_id, score in zip(ids, scores)]
+                for ids, scores in zip(best_ids, best_scores)]
+
+    def fetch(self, ids: list[int]) -> dict[int, dict]:
+        placeholders = ",".join("?" * len(ids))
+        rows = self.docs.execute(
+            f"SELECT id, content, source, topic, sub_topics FROM docs WHERE id IN ({placeholders})", ids)
+        return {row[0]: {"id": row[0], "content": row[1], "source": row[2], "topic": row[3], "sub_topics": row[4]}
+                for row in rows}
+
+    def vector_search(self, topic, embedding, top_k, sub_topics=None, source=None) -> list[dict]:
+        """Comme OracleVectorStore.vector_search : documents du topic, du plus proche au plus lointain.
+
+        Le filtre sub_topics (sous-chaîne, comme le LIKE de la version Oracle)
+        est appliqué aux résultats : la recherche est élargie jusqu'à top_k
+        documents retenus ou épuisement du topic.
+        """
+        wanted = top_k
+        while True:
+            hits = self.search(embedding, wanted, topic=topic, source=source)[0]
+            docs = self.fetch([doc_id for doc_id, _ in hits]) if hits else {}
+            results = []
+            for doc_id, score in hits:
+                doc = docs[doc_id]
+                if sub_topics and not any(sub in (doc["sub_topics"] or "") for sub in sub_topics):
+                    continue
+                results.append(dict(doc, score=score))
+            if len(results) >= top_k or len(hits) < wanted:
+                return results[:top_k]
+            wanted *= 4
+
+    def close(self):
+        self._vectors = None
+        self.docs.close()
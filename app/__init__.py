@@ -1,7 +1,21 @@
-from sanic import Sanic
+from sanic import Sanic, json, raw
+from sanic.log import logger
 from sanic_ext import Extend
 from app.core.config import settings
+from app.core.audit import audit_log, start_audit, stop_audit
+from app.core.cache import cache_stats, start_caches, stop_caches
+from app.core.database import (
+    open_request_session, close_request_session, pool_status, start_engine, stop_engine
+)
+from app.core.health import health_checker
+from app.core.ratelimit import stop_rate_limits
+from app.core.security import token_cache
+from app.utils.metrics import (
+    MetricsCollector, MetricsLogger, instrument_sqlalchemy, observe_request, start_request_timer,
+    worker_started, worker_stopped
+)
 from app.api.routes import auth_bp, accounts_bp, transactions_bp
+from app.services.account_service import warm_account_number_cache
 
 
 def create_app() -> Sanic:
@@ -12,13 +26,52 @@ def create_app() -> Sanic:
 
     Extend(app)
 
+    # Ressources par worker : créées au démarrage, libérées après le drainage
+    app.register_listener(start_engine, "before_server_start")
+    app.register_listener(start_caches, "before_server_start")
+    app.register_listener(warm_account_number_cache, "before_server_start")
+    app.register_listener(stop_caches, "after_server_stop")
+    app.register_listener(stop_rate_limits, "after_server_stop")
+    app.register_listener(stop_engine, "after_server_stop")
+    # Listeners d'arrêt exécutés dans l'ordre inverse : l'audit est vidé avant
+    # la fermeture du moteur
+    app.register_listener(start_audit, "before_server_start")
+    app.register_listener(stop_audit, "after_server_stop")
+    app.register_listener(worker_started, "before_server_start")
+    app.register_listener(worker_stopped, "after_server_stop")
+
+    # Enregistré en premier : le chronomètre englobe les autres middlewares,
+    # y compris le commit de la session (les middlewares réponse sont exécutés
+    # dans l'ordre inverse)
+    instrument_sqlalchemy()
+    app.register_middleware(start_request_timer, "request")
+    app.register_middleware(observe_request, "response")
+    app.register_middleware(open_request_session, "request")
+    app.register_middleware(close_request_session, "response")
+
     app.blueprint(auth_bp)
     app.blueprint(accounts_bp)
     app.blueprint(transactions_bp)
 
-    # Health check
+    # Health check / readiness : 503 si une dépendance ne répond pas
     @app.get("/")
     async def health_check(request):
-        return {"status": "healthy", "version": "1.0.0"}
+        health = await health_checker.check()
+        return json({
+            "status": health["status"],
+            "version": "1.0.0",
+            "checks": health["checks"],
+            "db_pool": pool_status(),
+            "token_cache": token_cache.stats(),
+            "caches": cache_stats(),
+            "audit": audit_log.stats()
+        }, status=200 if health["status"] == "healthy" else 503)
+
+    # Métriques Prometheus, agrégées sur tous les workers
+    metrics = MetricsCollector(MetricsLogger(logger))
+
+    @app.get("/metrics")
+    async def metrics_endpoint(request):
+        return raw(metrics.as_response(), content_type=metrics.content_type)
 
     return app
\ No newline at end of file
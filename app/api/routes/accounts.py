@@ -1,10 +1,17 @@
-from sanic import json, Blueprint
+from datetime import datetime, timedelta
+from urllib.parse import unquote
+
+from sanic import Blueprint
+from sanic.exceptions import BadRequest
 from sanic.views import HTTPMethodView
 from sanic_ext import validate, openapi
 
-from app.api.schemas import AccountCreateRequest, AccountResponse
+from app.api.schemas import AccountCreateRequest, AccountNumberResponse, AccountResponse, BalanceHistoryQuery
+from app.core.config import settings
 from app.core.security import protected
 from app.services.account_service import AccountService
+from app.services.rollup_service import RollupService
+from app.utils.serialization import json_response
 
 accounts_bp = Blueprint("accounts", url_prefix="/accounts")
 
@@ -14,8 +21,8 @@ class AccountView(HTTPMethodView):
     async def get(self, request):
         """Get all accounts for the authenticated user"""
         user_id = request.ctx.user_id
-        accounts = await AccountService.get_user_accounts(user_id)
-        return json([account.to_dict() for account in accounts])
+        accounts = await AccountService.get_user_accounts(request.ctx.session, user_id)
+        return json_response(accounts)
 
     @validate(json=AccountCreateRequest)
     @openapi.definition(
@@ -27,8 +34,35 @@ class AccountView(HTTPMethodView):
     async def post(self, request, body: AccountCreateRequest):
         """Create a new account for the authenticated user"""
         user_id = request.ctx.user_id
-        account = await AccountService.create_account(user_id, body.account_type)
-        return json(account.to_dict(), status=201)
+        account = await AccountService.create_account(request.ctx.session, user_id, body.account_type)
+        return json_response(account.to_dict(), status=201)
 
 # Register the view
-accounts_bp.add_route(AccountView.as_view(), "/")
\ No newline at end of file
+accounts_bp.add_route(AccountView.as_view(), "/")
+
+
+@accounts_bp.get("/by-number/<account_number:str>")
+@protected()
+@openapi.definition(response=AccountNumberResponse, summary="Resolve an account number (IBAN)", tag="accounts")
+async def resolve_account_number(request, account_number: str):
+    """Résout un IBAN en id de compte, servi depuis le cache du worker"""
+    account_number = AccountService.normalize_account_number(unquote(account_number))
+    account_id = await AccountService.resolve_account_number(request.ctx.session, account_number)
+    return json_response({"id": account_id, "account_number": account_number})
+
+
+@accounts_bp.get("/<account_id:int>/balance-history")
+@protected()
+@validate(query=BalanceHistoryQuery)
+async def balance_history(request, account_id: int, query: BalanceHistoryQuery):
+    """Relevé journalier (?from=AAAA-MM-JJ&to=AAAA-MM-JJ), lu dans les agrégats"""
+    end = query.to or datetime.utcnow().date()
+    start = query.from_ or end - timedelta(days=settings.BALANCE_HISTORY_DEFAULT_DAYS)
+    if start > end:
+        raise BadRequest("'from' must not be after 'to'")
+    if (end - start).days > settings.BALANCE_HISTORY_MAX_DAYS:
+        raise BadRequest(f"Period cannot exceed {settings.BALANCE_HISTORY_MAX_DAYS} days")
+
+    history = await RollupService.get_balance_history(
+        request.ctx.session, request.ctx.user_id, account_id, start, end)
+    return json_response(history)
@@ -6,6 +6,9 @@ from app.api.schemas import (
     UserRegisterRequest,
     UserResponse
 )
+from app.core.ratelimit import (
+    client_ip, login_email, login_email_limiter, login_ip_limiter, rate_limited
+)
 from app.services.auth_service import AuthService
 
 auth_bp = Blueprint("auth", url_prefix="/auth")
@@ -21,6 +24,7 @@ auth_bp = Blueprint("auth", url_prefix="/auth")
 )
 async def register(request, body: UserRegisterRequest):
     user = await AuthService.register_user(
+        request.ctx.session,
         email=body.email,
         password=body.password,
         first_name=body.first_name,
@@ -36,6 +40,7 @@ async def register(request, body: UserRegisterRequest):
 
 
 @auth_bp.post("/login")
+@rate_limited((login_ip_limiter, client_ip), (login_email_limiter, login_email))
 @validate(json=UserLoginRequest)
 @openapi.definition(
     body=UserLoginRequest,
@@ -45,8 +50,10 @@ async def register(request, body: UserRegisterRequest):
 )
 async def login(request, body: UserLoginRequest):
     auth_data = await AuthService.login_user(
+        request.ctx.session,
         email=body.email,
-        password=body.password
+        password=body.password,
+        ip=request.remote_addr or request.ip
     )
 
     return json({
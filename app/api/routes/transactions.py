@@ -1,24 +1,63 @@
-from sanic import json, Blueprint
+from sanic import Blueprint
+from sanic.exceptions import BadRequest
 from sanic.views import HTTPMethodView
 from sanic_ext import validate, openapi
 
-from app.api.schemas import TransactionCreateRequest, TransactionResponse
+from app.api.schemas import (
+    TransactionBatchRequest,
+    TransactionBatchResponse,
+    TransactionCreateRequest,
+    TransactionListQuery,
+    TransactionResponse
+)
+from app.core.config import settings
+from app.core.idempotency import idempotent
+from app.core.ratelimit import current_user, rate_limited, transactions_limiter
 from app.core.security import protected
 from app.services.transaction_service import TransactionService
+from app.utils.helpers import encode_cursor, decode_cursor
+from app.utils.serialization import dumps, json_response
 
 transactions_bp = Blueprint("transactions", url_prefix="/transactions")
 
+NDJSON = "application/x-ndjson"
+
 
 class TransactionView(HTTPMethodView):
     decorators = [protected()]
 
-    async def get(self, request, account_id: int):
-        """Liste des transactions d'un compte"""
+    @validate(query=TransactionListQuery)
+    async def get(self, request, account_id: int, query: TransactionListQuery):
+        """Liste des transactions d'un compte.
+
+        Paginée par curseur : la page suivante s'obtient en repassant l'en-tête
+        X-Next-Cursor dans ?cursor=. Avec ?stream=true (ou Accept: application/x-ndjson)
+        tout l'historique est envoyé en NDJSON, ligne par ligne.
+        """
         user_id = request.ctx.user_id
-        await TransactionService.verify_account_ownership(user_id, account_id)
-        transactions = await TransactionService.get_transactions(account_id)
-        return json([tx.to_dict() for tx in transactions])
+        session = request.ctx.session
+
+        if query.stream or request.headers.get("Accept") == NDJSON:
+            await TransactionService.verify_account_ownership(session, user_id, account_id)
+            response = await request.respond(content_type=NDJSON)
+            async for batch in TransactionService.stream_transactions(
+                    account_id, settings.TRANSACTIONS_STREAM_BATCH_SIZE):
+                await response.send(b"".join(dumps(tx) + b"\n" for tx in batch))
+            await response.eof()
+            return
+
+        try:
+            cursor = decode_cursor(query.cursor) if query.cursor else None
+        except ValueError:
+            raise BadRequest("Invalid cursor")
+
+        transactions, last = await TransactionService.get_transactions(
+            session, user_id, account_id, query.limit, cursor)
+        headers = {"X-Next-Cursor": encode_cursor(*last)} if last else None
+        return json_response(transactions, headers=headers)
 
+    @rate_limited((transactions_limiter, current_user))
+    @idempotent()
     @validate(json=TransactionCreateRequest)
     @openapi.definition(
         body=TransactionCreateRequest,
@@ -27,19 +66,43 @@ class TransactionView(HTTPMethodView):
         tag="transactions"
     )
     async def post(self, request, account_id: int, body: TransactionCreateRequest):
-        """Création d'une transaction"""
-        user_id = request.ctx.user_id
-        await TransactionService.verify_account_ownership(user_id, account_id)
-
+        """Création d'une transaction (rejouable avec l'en-tête Idempotency-Key)"""
         transaction = await TransactionService.create_transaction(
+            request.ctx.session,
+            user_id=request.ctx.user_id,
             account_id=account_id,
             amount=body.amount,
             transaction_type=body.transaction_type,
             to_account_id=body.to_account_id,
-            description=body.description
+            description=body.description,
+            to_account_number=body.to_account_number
         )
 
-        return json(transaction.to_dict(), status=201)
+        return json_response(transaction.to_dict(), status=201)
+
+
+transactions_bp.add_route(TransactionView.as_view(), "/<account_id:int>")
+
 
+@transactions_bp.post("/<account_id:int>/batch")
+@protected()
+@rate_limited((transactions_limiter, current_user))
+@idempotent()
+@validate(json=TransactionBatchRequest)
+@openapi.definition(
+    body=TransactionBatchRequest,
+    response=TransactionBatchResponse,
+    summary="Create transactions in bulk",
+    tag="transactions"
+)
+async def create_transactions_batch(request, account_id: int, body: TransactionBatchRequest):
+    """Création d'un lot de transactions, avec un résultat par élément"""
+    results = await TransactionService.create_transactions_bulk(
+        request.ctx.session, request.ctx.user_id, account_id, body.transactions)
+    created = sum(1 for result in results if result["status"] == "created")
 
-transactions_bp.add_route(TransactionView.as_view(), "/<account_id:int>")
\ No newline at end of file
+    return json_response({
+        "created": created,
+        "rejected": len(results) - created,
+        "results": results
+    }, status=201 if created == len(results) else 207)
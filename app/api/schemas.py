@@ -1,9 +1,12 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
 from enum import Enum
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, date
 from enum import Enum as PyEnum
 
+from app.core.config import settings
+from app.utils.helpers import to_money
+
 
 class AccountType(PyEnum):
     SAVINGS = "SAVINGS"
@@ -42,10 +45,14 @@ class AccountCreateRequest(BaseModel):
 class AccountResponse(BaseModel):
     id: int
     account_number: str
-    balance: float
+    balance: str
     account_type: AccountType
     is_active: bool
 
+class AccountNumberResponse(BaseModel):
+    id: int
+    account_number: str
+
 class AccountListResponse(BaseModel):
     accounts: list[AccountResponse]
 
@@ -53,16 +60,56 @@ class TransactionCreateRequest(BaseModel):
     amount: float = Field(..., gt=0, example=100.00)
     transaction_type: TransactionType
     to_account_id: Optional[int] = Field(None, example=2)
+    to_account_number: Optional[str] = Field(None, max_length=42, example="FR7630001007940000000000148")
     description: Optional[str] = Field(None, example="Monthly rent payment")
 
+    @field_validator("amount")
+    @classmethod
+    def cents_only(cls, amount: float) -> float:
+        to_money(amount)  # ValueError : plus de 2 décimales ou hors de Numeric(12, 2)
+        return amount
+
+    @model_validator(mode="after")
+    def single_destination(self):
+        if self.to_account_id is not None and self.to_account_number is not None:
+            raise ValueError("Provide either to_account_id or to_account_number, not both")
+        if self.transaction_type != TransactionType.TRANSFER and (
+                self.to_account_id is not None or self.to_account_number is not None):
+            raise ValueError("A destination account is only allowed for transfers")
+        return self
+
+class TransactionBatchRequest(BaseModel):
+    transactions: list[TransactionCreateRequest] = Field(
+        ..., min_length=1, max_length=settings.TRANSACTIONS_BATCH_MAX_SIZE)
+
+class TransactionBatchItemResult(BaseModel):
+    index: int
+    status: str
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class TransactionBatchResponse(BaseModel):
+    created: int
+    rejected: int
+    results: list[TransactionBatchItemResult]
+
 class TransactionResponse(BaseModel):
     id: int
     account_id: int
-    amount: float
+    amount: str
     transaction_type: TransactionType
     to_account_id: Optional[int]
     description: Optional[str]
     timestamp: datetime
 
 class TransactionListResponse(BaseModel):
-    transactions: list[TransactionResponse]
\ No newline at end of file
+    transactions: list[TransactionResponse]
+
+class TransactionListQuery(BaseModel):
+    limit: int = Field(settings.TRANSACTIONS_PAGE_SIZE, ge=1, le=settings.TRANSACTIONS_MAX_PAGE_SIZE)
+    cursor: Optional[str] = None
+    stream: bool = False
+
+class BalanceHistoryQuery(BaseModel):
+    from_: Optional[date] = Field(None, alias="from")
+    to: Optional[date] = None
@@ -0,0 +1,195 @@
+"""Journal d'audit asynchrone (write-behind).
+
+Les requêtes n'écrivent pas l'audit elles-mêmes : emit() dépose l'événement
+dans une file en mémoire du worker et rend la main immédiatement. Une tâche de
+fond vide la file par lots, dès que AUDIT_BATCH_SIZE événements attendent ou
+au plus tard toutes les AUDIT_FLUSH_INTERVAL secondes, vers la table
+audit_events (AUDIT_SINK=database) ou vers des fichiers JSON Lines compressés
+(AUDIT_SINK=file) renouvelés au-delà de AUDIT_FILE_MAX_BYTES.
+
+La file est bornée (AUDIT_QUEUE_SIZE) : si l'écriture ne suit pas, les
+événements en excès sont abandonnés et comptés (banking_audit_events
+{result="dropped"}) plutôt que de ralentir les requêtes. À l'arrêt du worker,
+stop_audit écrit tout ce qui reste dans la file avant la fermeture du moteur.
+"""
+import asyncio
+import gzip
+import os
+from datetime import datetime
+from pathlib import Path
+
+from sanic.log import error_logger
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.core.database import after_commit, get_engine
+from app.models.audit_event import AuditEvent
+from app.utils.metrics import AUDIT_EVENTS
+from app.utils.serialization import dumps
+
+_written = AUDIT_EVENTS.labels("written")
+_dropped = AUDIT_EVENTS.labels("dropped")
+_failed = AUDIT_EVENTS.labels("failed")
+
+
+class DatabaseSink:
+    """Un INSERT multi-lignes par lot, sur une connexion du pool hors de toute requête"""
+
+    async def write(self, events: list[dict]):
+        async with get_engine().begin() as conn:
+            await conn.execute(insert(AuditEvent), events)
+
+    async def close(self):
+        pass
+
+
+class FileSink:
+    """Fichiers audit-<pid>-<horodatage>.jsonl.gz, un par worker, renouvelés par taille.
+
+    Chaque lot est un membre gzip : un fichier interrompu reste lisible
+    jusqu'au dernier lot écrit. La compression et l'écriture se font dans un
+    thread pour ne pas bloquer la boucle d'événements.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._file = None
+        self._size = 0
+
+    def _open(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"audit-{os.getpid()}-{datetime.utcnow():%Y%m%d-%H%M%S-%f}.jsonl.gz"
+        self._file = open(self.directory / name, "ab")
+        self._size = 0
+
+    def _write(self, events: list[dict]):
+        if self._file is None or self._size >= self.max_bytes:
+            self._close()
+            self._open()
+        payload = gzip.compress(b"".join(dumps(event) + b"\n" for event in events))
+        self._file.write(payload)
+        self._file.flush()
+        self._size += len(payload)
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    async def write(self, events: list[dict]):
+        await asyncio.to_thread(self._write, events)
+
+    async def close(self):
+        await asyncio.to_thread(self._close)
+
+
+class AuditLog:
+    """File d'événements d'audit du worker et tâche d'écriture associée"""
+
+    def __init__(self, batch_size: int, flush_interval: float, queue_size: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.sink = None
+        self._queue = None
+        self._wakeup = None
+        self._task = None
+        self._closing = False
+
+    def emit(self, event: str, user_id: int = None, account_id: int = None, ip: str = None, **data):
+        """Enregistre un événement ; ne bloque jamais, n'échoue jamais.
+
+        Sans tâche d'écriture (scripts, tests hors serveur) l'événement est ignoré.
+        """
+        if self._task is None:
+            return
+        try:
+            self._queue.put_nowait({
+                "timestamp": datetime.utcnow(),
+                "event": event,
+                "user_id": user_id,
+                "account_id": account_id,
+                "ip": ip,
+                "data": data or None,
+            })
+        except asyncio.QueueFull:
+            _dropped.inc()
+            return
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+
+    def start(self, sink):
+        self.sink = sink
+        self._queue = asyncio.Queue(self.queue_size)
+        self._wakeup = asyncio.Event()
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Écrit les événements en attente puis arrête la tâche"""
+        if self._task is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        await self.sink.close()
+
+    def _next_batch(self) -> list[dict]:
+        batch = []
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        while True:
+            if not self._closing and self._queue.qsize() < self.batch_size:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            batch = self._next_batch()
+            if not batch:
+                if self._closing:
+                    return
+                continue
+            try:
+                await self.sink.write(batch)
+            except Exception:
+                _failed.inc(len(batch))
+                error_logger.exception("Failed to write %d audit events", len(batch))
+            else:
+                _written.inc(len(batch))
+
+    def stats(self) -> dict:
+        return {
+            "sink": settings.AUDIT_SINK,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": self.queue_size,
+        }
+
+
+audit_log = AuditLog(settings.AUDIT_BATCH_SIZE, settings.AUDIT_FLUSH_INTERVAL, settings.AUDIT_QUEUE_SIZE)
+
+
+def audit_after_commit(session, event: str, **fields):
+    """Émet l'événement une fois la session validée : rien n'est audité pour un rollback"""
+    async def emit():
+        audit_log.emit(event, **fields)
+
+    after_commit(session, emit)
+
+
+async def start_audit(app):
+    """Listener before_server_start"""
+    if settings.AUDIT_SINK == "database":
+        audit_log.start(DatabaseSink())
+    elif settings.AUDIT_SINK == "file":
+        audit_log.start(FileSink(settings.AUDIT_FILE_DIR, settings.AUDIT_FILE_MAX_BYTES))
+
+
+async def stop_audit(app):
+    """Listener after_server_stop : à exécuter avant stop_engine (DatabaseSink)"""
+    await audit_log.stop()
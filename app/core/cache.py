@@ -0,0 +1,196 @@
+import json
+import time
+from collections import OrderedDict
+
+from sanic.log import logger
+
+from app.core.config import settings
+from app.utils.metrics import cache_counters
+
+caches = {}
+
+
+class MemoryBackend:
+    """Backend en mémoire du worker : LRU borné avec expiration (TTL).
+
+    Avec evict_live=False (liste de révocation), seules les entrées expirées
+    sont supprimées : au-delà de maxsize entrées encore valides, le backend
+    grossit et le signale dans les logs plutôt que d'oublier une entrée.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, evict_live: bool = True):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.evict_live = evict_live
+        self._limit = maxsize  # taille déclenchant la purge des entrées expirées
+        self._entries = OrderedDict()  # clé -> (expiration, valeur)
+
+    async def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    async def set(self, key: str, value, ttl: float = None):
+        self._entries[key] = (time.monotonic() + (ttl or self.ttl), value)
+        self._entries.move_to_end(key)
+        if not self.evict_live:
+            if len(self._entries) > self._limit:
+                self._purge_expired()
+            return
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        for key in [key for key, entry in self._entries.items() if entry[0] <= now]:
+            del self._entries[key]
+        # Purge suivante quand la taille aura doublé : coût amorti constant
+        self._limit = max(self.maxsize, 2 * len(self._entries))
+        if len(self._entries) > self.maxsize:
+            logger.warning("Cache holds %d unexpired entries, above its maxsize of %d",
+                           len(self._entries), self.maxsize)
+
+    async def get_many(self, *keys: str) -> list:
+        return [await self.get(key) for key in keys]
+
+    async def add(self, key: str, value, ttl: float = None) -> bool:
+        """Écrit la valeur seulement si la clé est absente ; retourne True si écrite"""
+        if await self.get(key) is not None:
+            return False
+        await self.set(key, value, ttl)
+        return True
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._entries.pop(key, None)
+
+
+class RedisBackend:
+    """Backend partagé entre workers ; les valeurs doivent être sérialisables en JSON"""
+
+    def __init__(self, url: str, ttl: float, prefix: str = "banking:"):
+        try:
+            from redis import asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from exc
+        self.client = redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key: str):
+        value = await self.client.get(self.prefix + key)
+        return None if value is None else json.loads(value)
+
+    async def get_many(self, *keys: str) -> list:
+        """Un seul aller-retour (MGET) pour plusieurs clés"""
+        values = await self.client.mget(*(self.prefix + key for key in keys))
+        return [None if value is None else json.loads(value) for value in values]
+
+    async def set(self, key: str, value, ttl: float = None):
+        await self.client.set(self.prefix + key, json.dumps(value), ex=int(ttl or self.ttl))
+
+    async def add(self, key: str, value, ttl: float = None) -> bool:
+        return bool(await self.client.set(
+            self.prefix + key, json.dumps(value), ex=int(ttl or self.ttl), nx=True))
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self.client.delete(*(self.prefix + key for key in keys))
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def build_backend(ttl: float = None, maxsize: int = None, evict_live: bool = True):
+    """Backend choisi par CACHE_BACKEND (memory ou redis)"""
+    ttl = ttl or settings.CACHE_TTL
+    if settings.CACHE_BACKEND == "redis":
+        return RedisBackend(settings.CACHE_URL, ttl)
+    return MemoryBackend(maxsize or settings.CACHE_MAX_ENTRIES, ttl, evict_live)
+
+
+class Cache:
+    """Cache lecture-traversante nommé, avec compteurs de hits/misses.
+
+    Le backend est construit au premier usage (ou par start_caches au démarrage
+    du worker) : un client Redis appartient à la boucle d'événements du worker
+    qui l'a créé. Il reste remplaçable (cache.backend = ...) : un stand-in local
+    peut prendre la place d'un backend partagé dans les tests.
+    """
+
+    def __init__(self, name: str, ttl: float = None, maxsize: int = None, evict_live: bool = True):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.evict_live = evict_live
+        self._backend = None
+        self.hits = 0
+        self.misses = 0
+        self._hit_counter, self._miss_counter = cache_counters(name)
+        caches[name] = self
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = build_backend(self.ttl, self.maxsize, self.evict_live)
+        return self._backend
+
+    @backend.setter
+    def backend(self, backend):
+        self._backend = backend
+
+    async def get(self, key: str):
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            self._miss_counter.inc()
+        else:
+            self.hits += 1
+            self._hit_counter.inc()
+        return value
+
+    async def get_many(self, *keys: str) -> list:
+        values = await self.backend.get_many(*keys)
+        found = sum(value is not None for value in values)
+        self.hits += found
+        self.misses += len(values) - found
+        self._hit_counter.inc(found)
+        self._miss_counter.inc(len(values) - found)
+        return values
+
+    async def set(self, key: str, value, ttl: float = None):
+        await self.backend.set(key, value, ttl)
+
+    async def delete(self, *keys: str):
+        await self.backend.delete(*keys)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def cache_stats() -> dict:
+    return {name: cache.stats() for name, cache in caches.items()}
+
+
+async def start_caches(app):
+    """Listener before_server_start : construit les backends de ce worker"""
+    for cache in caches.values():
+        cache.backend
+
+
+async def stop_caches(app):
+    """Listener after_server_stop : ferme les clients Redis, liés à la boucle du worker"""
+    for cache in caches.values():
+        if isinstance(cache._backend, RedisBackend):
+            await cache._backend.close()
+            cache._backend = None
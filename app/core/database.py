@@ -1,21 +1,173 @@
+import time
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeout
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sanic import json
+from sanic.log import error_logger
 from app.core.config import settings
+from app.utils.metrics import DB_POOL_WAIT, DB_POOL_TIMEOUTS
 from contextlib import asynccontextmanager
 
-# Configuration SQLite
-engine = create_async_engine(
-    settings.DB_URL,
-    connect_args={"check_same_thread": False},  # Nécessaire pour SQLite
-    echo=settings.DEBUG
-)
+
+class PoolStats:
+    """Compteurs d'attente sur le pool de connexions (par worker)"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, wait: float):
+        DB_POOL_WAIT.observe(wait)
+        self.checkouts += 1
+        self.wait_total += wait
+        if wait > self.wait_max:
+            self.wait_max = wait
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Pool asyncio qui mesure le temps passé à obtenir une connexion.
+
+    Le temps mesuré comprend l'attente d'une connexion libre et, le cas
+    échéant, l'ouverture d'une nouvelle connexion.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            pool_stats.timeouts += 1
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            pool_stats.record(time.perf_counter() - start)
+
+
+def pool_budget() -> tuple[int, int]:
+    """Taille du pool et débordement autorisés pour ce worker.
+
+    DB_MAX_CONNECTIONS est un budget global réparti entre les WORKERS : avec N
+    workers, le serveur n'ouvre jamais plus de DB_MAX_CONNECTIONS connexions.
+    """
+    pool_size, max_overflow = settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW
+    if settings.DB_MAX_CONNECTIONS:
+        per_worker = max(1, settings.DB_MAX_CONNECTIONS // max(1, settings.WORKERS))
+        pool_size = min(pool_size, per_worker)
+        max_overflow = max(0, min(max_overflow, per_worker - pool_size))
+    return pool_size, max_overflow
+
+
+def engine_options(db_url: str) -> dict:
+    """Options de create_async_engine adaptées au pilote de DB_URL"""
+    url = make_url(db_url)
+    options = {"echo": settings.DEBUG}
+
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if url.database in (None, "", ":memory:"):
+            # Base en mémoire : une seule connexion partagée, pas de pool à régler
+            return options
+    elif url.get_driver_name() == "asyncpg":
+        options["connect_args"] = {
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "command_timeout": settings.DB_COMMAND_TIMEOUT,
+        }
+
+    pool_size, max_overflow = pool_budget()
+    options.update(
+        poolclass=InstrumentedPool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    return options
+
+
+def pool_status() -> dict:
+    """État du pool de ce worker : connexions prises, débordement, attente"""
+    pool = engine.pool if engine is not None else None
+    status = {
+        "checkouts": pool_stats.checkouts,
+        "timeouts": pool_stats.timeouts,
+        "wait_avg_ms": pool_stats.wait_total / pool_stats.checkouts * 1000 if pool_stats.checkouts else 0.0,
+        "wait_max_ms": pool_stats.wait_max * 1000,
+    }
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(0, pool.overflow()),
+        )
+    return status
+
+
+# Le moteur est créé à la demande (get_engine) : dans le serveur, par chaque
+# worker au démarrage, jamais à l'import dans le processus principal.
+engine = None
 
 async_session = sessionmaker(
-    engine,
     expire_on_commit=False,
     class_=AsyncSession
 )
 
+
+def get_engine():
+    """Moteur du processus courant, créé et lié à async_session au premier appel"""
+    global engine
+    if engine is None:
+        engine = create_async_engine(settings.DB_URL, **engine_options(settings.DB_URL))
+        async_session.configure(bind=engine)
+    return engine
+
+
+async def dispose_engine():
+    """Ferme les connexions du pool ; le prochain get_engine() en recrée un"""
+    global engine
+    if engine is not None:
+        await engine.dispose()
+        engine = None
+
+
+async def start_engine(app):
+    """Listener before_server_start : un moteur (et un pool) par worker"""
+    get_engine()
+
+
+async def stop_engine(app):
+    """Listener after_server_stop : appelé une fois les requêtes en cours terminées"""
+    await dispose_engine()
+
+
+def after_commit(session, callback):
+    """Programme une coroutine (sans argument) à exécuter une fois la session validée.
+
+    Sert aux effets de bord qui ne doivent pas précéder le commit, comme
+    l'invalidation d'un cache : invalider avant laisserait une lecture
+    concurrente y remettre l'ancienne valeur.
+    """
+    session.info.setdefault("after_commit", []).append(callback)
+
+
+async def run_after_commit(session):
+    for callback in session.info.pop("after_commit", []):
+        try:
+            await callback()
+        except Exception:
+            error_logger.exception("after_commit callback failed")
+
+
 @asynccontextmanager
 async def get_db():
     """Gestionnaire de contexte asynchrone pour les sessions de base de données"""
@@ -26,5 +178,37 @@ async def get_db():
         except Exception:
             await session.rollback()
             raise
+        else:
+            await run_after_commit(session)
         finally:
             await session.close()
+
+
+async def open_request_session(request):
+    """Middleware : une session par requête, exposée dans request.ctx.session.
+
+    La connexion n'est prise dans le pool qu'à la première requête SQL :
+    les routes qui ne touchent pas la base ne coûtent rien.
+    """
+    request.ctx.session = async_session()
+
+
+async def close_request_session(request, response):
+    """Middleware : valide la session si la réponse est un succès, l'annule sinon"""
+    session = getattr(request.ctx, "session", None)
+    if session is None:
+        return
+
+    try:
+        if response is not None and response.status < 400:
+            await session.commit()
+            await run_after_commit(session)
+        else:
+            await session.rollback()
+    except SQLAlchemyError:
+        error_logger.exception("Failed to commit request session")
+        await session.rollback()
+        return json({"description": "Internal Server Error", "status": 500,
+                     "message": "Database error"}, status=500)
+    finally:
+        await session.close()
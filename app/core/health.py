@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from app.core.cache import caches, RedisBackend
+from app.core.config import settings
+from app.core.database import get_engine
+
+
+class HealthChecker:
+    """Sondes de disponibilité exécutées en parallèle, chacune bornée par un timeout.
+
+    Le dernier résultat est conservé HEALTH_CHECK_TTL secondes : les sondes
+    répétées d'un répartiteur de charge ne sollicitent pas les bases à chaque
+    appel. Des appels simultanés partagent la même vérification en cours.
+    """
+
+    def __init__(self, timeout: float, ttl: float):
+        self.timeout = timeout
+        self.ttl = ttl
+        self.probes = {}        # nom -> coroutine sans argument
+        self._result = None
+        self._checked_at = 0.0
+        self._running = None
+
+    def register(self, name: str, probe):
+        self.probes[name] = probe
+
+    async def _run(self, name: str, probe) -> tuple[str, dict]:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(probe(), self.timeout)
+        except asyncio.TimeoutError:
+            error = f"Timed out after {self.timeout}s"
+        except Exception as exc:
+            error = str(exc) or type(exc).__name__
+        else:
+            error = None
+
+        check = {
+            "status": "healthy" if error is None else "unhealthy",
+            "response_time_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+        if error is not None:
+            check["error"] = error
+        return name, check
+
+    async def _check_all(self) -> dict:
+        checks = dict(await asyncio.gather(
+            *(self._run(name, probe) for name, probe in self.probes.items())))
+        healthy = all(check["status"] == "healthy" for check in checks.values())
+        return {"status": "healthy" if healthy else "unhealthy", "checks": checks}
+
+    async def check(self) -> dict:
+        """Résultat des sondes, servi depuis le cache s'il a moins de ttl secondes"""
+        if self._result is not None and time.monotonic() - self._checked_at < self.ttl:
+            return self._result
+
+        if self._running is None:
+            self._running = asyncio.ensure_future(self._check_all())
+        running = self._running
+        try:
+            result = await asyncio.shield(running)
+        finally:
+            if self._running is running and running.done():
+                self._running = None
+        self._result, self._checked_at = result, time.monotonic()
+        return result
+
+
+async def check_database():
+    async with get_engine().connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def check_cache():
+    for cache in caches.values():
+        if isinstance(cache.backend, RedisBackend):
+            await cache.backend.client.ping()
+            return
+
+
+health_checker = HealthChecker(settings.HEALTH_CHECK_TIMEOUT, settings.HEALTH_CHECK_TTL)
+health_checker.register("database", check_database)
+if settings.CACHE_BACKEND == "redis":
+    health_checker.register("cache", check_cache)
@@ -0,0 +1,108 @@
+import asyncio
+import hashlib
+import time
+from functools import wraps
+
+from sanic import Request
+from sanic.exceptions import BadRequest, SanicException
+from sanic.response import HTTPResponse
+
+from app.core.cache import Cache
+from app.core.config import settings
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+idempotency_cache = Cache(
+    "idempotency", ttl=settings.IDEMPOTENCY_TTL, maxsize=settings.IDEMPOTENCY_MAX_ENTRIES)
+_in_flight = {}  # clé -> asyncio.Future des requêtes en cours sur ce worker
+
+
+class IdempotencyConflict(SanicException):
+    status_code = 409
+    quiet = True
+    message = "A request with this Idempotency-Key is still in progress"
+
+
+class IdempotencyKeyReused(SanicException):
+    status_code = 422
+    quiet = True
+    message = "Idempotency-Key already used for a different request"
+
+
+def _replay(stored: dict, fingerprint: str) -> HTTPResponse:
+    if stored["fingerprint"] != fingerprint:
+        raise IdempotencyKeyReused()
+    return HTTPResponse(
+        stored["body"],
+        status=stored["status"],
+        headers={"Idempotent-Replayed": "true"},
+        content_type=stored["content_type"]
+    )
+
+
+def idempotent():
+    """Rejoue la réponse déjà produite pour un même (utilisateur, Idempotency-Key).
+
+    À placer sous protected(). La recherche est un accès dictionnaire (ou un GET
+    sur le backend partagé). Un doublon concurrent attend la fin de la première
+    requête au lieu de la ré-exécuter. La session de la requête est validée ici,
+    avant d'enregistrer la réponse : une réponse n'est rejouée que si
+    l'écriture correspondante est effectivement en base. Les erreurs ne sont
+    pas mémorisées, un nouvel essai ré-exécute la requête.
+    """
+    def decorator(f):
+        @wraps(f)
+        async def decorated_function(*args, **kwargs):
+            # Fonction de route ou méthode d'une HTTPMethodView (args[0] est alors la vue)
+            request = args[0] if isinstance(args[0], Request) else args[1]
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if key is None:
+                return await f(*args, **kwargs)
+            if not key or len(key) > 255:
+                raise BadRequest(f"Invalid {IDEMPOTENCY_HEADER} header")
+
+            scope = f"idem:{request.ctx.user_id}:{key}"
+            fingerprint = hashlib.blake2b(
+                request.method.encode() + request.path.encode() + request.body, digest_size=16
+            ).hexdigest()
+
+            deadline = time.monotonic() + settings.IDEMPOTENCY_LOCK_TIMEOUT
+            while True:
+                stored = await idempotency_cache.get(scope)
+                if stored is not None:
+                    return _replay(stored, fingerprint)
+
+                waiter = _in_flight.get(scope)
+                if waiter is not None:
+                    await asyncio.shield(waiter)
+                    continue
+                # Verrou partagé : un autre worker peut traiter la même clé
+                if await idempotency_cache.backend.add(
+                        f"{scope}:lock", 1, settings.IDEMPOTENCY_LOCK_TIMEOUT):
+                    break
+                if time.monotonic() > deadline:
+                    raise IdempotencyConflict()
+                await asyncio.sleep(0.05)
+
+            _in_flight[scope] = asyncio.get_running_loop().create_future()
+            session = request.ctx.session
+            try:
+                response = await f(*args, **kwargs)
+                await session.commit()
+                await idempotency_cache.set(scope, {
+                    "fingerprint": fingerprint,
+                    "status": response.status,
+                    "content_type": response.content_type,
+                    "body": response.body.decode(),
+                })
+                return response
+            except BaseException:
+                await session.rollback()
+                raise
+            finally:
+                await idempotency_cache.backend.delete(f"{scope}:lock")
+                _in_flight.pop(scope).set_result(None)
+
+        return decorated_function
+
+    return decorator
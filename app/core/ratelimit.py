@@ -0,0 +1,207 @@
+"""Limitation de débit par seaux à jetons (token buckets).
+
+Chaque clé (IP, email, utilisateur) dispose d'un seau de `burst` jetons qui
+se remplit au rythme de `per_minute` jetons par minute ; une requête consomme
+un jeton, sans jeton elle est refusée (429, en-tête Retry-After). Le refus est
+décidé dans le décorateur rate_limited, avant la validation du corps, toute
+requête SQL et tout hachage de mot de passe.
+
+Backend mémoire (par worker) : un couple (jetons, date) par clé, dans un
+OrderedDict trié par dernier accès. Les seaux inactifs sont évincés au fil des
+accès, depuis les plus anciens : un seau plein équivaut à une clé absente.
+Avec RATE_LIMIT_BACKEND=redis, l'état est partagé entre workers et le calcul
+est fait atomiquement par un script Lua ; Redis expire lui-même les seaux
+inactifs. Si Redis ne répond pas, la requête est acceptée (fail open).
+"""
+import time
+from collections import OrderedDict
+from functools import wraps
+from math import ceil
+
+from sanic import Request
+from sanic.exceptions import SanicException
+from sanic.log import error_logger
+
+from app.core.config import settings
+from app.utils.metrics import RATE_LIMITED
+
+limiters = {}
+
+
+class TooManyRequests(SanicException):
+    status_code = 429
+    message = "Too many requests"
+    quiet = True
+
+
+class MemoryBuckets:
+    def __init__(self, per_second: float, burst: int, maxsize: int):
+        self.per_second = per_second
+        self.burst = burst
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()  # clé -> (jetons, date du dernier accès)
+
+    async def take(self, key: str) -> float:
+        now = time.monotonic()
+        state = self._buckets.get(key)
+        if state is None:
+            tokens = self.burst
+        else:
+            tokens = min(self.burst, state[0] + (now - state[1]) * self.per_second)
+            self._buckets.move_to_end(key)
+
+        if tokens >= 1:
+            tokens, wait = tokens - 1, 0.0
+        else:
+            wait = (1 - tokens) / self.per_second
+        self._buckets[key] = (tokens, now)
+        self._evict(now)
+        return wait
+
+    def _evict(self, now: float):
+        """Retire les seaux les plus anciens s'ils sont pleins ou si la limite de taille est dépassée"""
+        buckets = self._buckets
+        while buckets:
+            tokens, last = next(iter(buckets.values()))
+            if len(buckets) <= self.maxsize and tokens + (now - last) * self.per_second < self.burst:
+                return
+            buckets.popitem(last=False)
+
+    async def close(self):
+        pass
+
+
+_TAKE_SCRIPT = """
+local per_second, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local last = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - last) * per_second)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / per_second
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+return tostring(wait)
+"""
+
+
+class RedisBuckets:
+    """Seaux partagés entre workers ; un aller-retour (EVALSHA) par requête"""
+
+    def __init__(self, url: str, per_second: float, burst: int, prefix: str):
+        try:
+            from redis import asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package") from exc
+        self.client = redis.from_url(url)
+        self.per_second = per_second
+        self.burst = burst
+        self.prefix = prefix
+        self.ttl = ceil(burst / per_second) + 1  # durée de remplissage complet
+        self._take = self.client.register_script(_TAKE_SCRIPT)
+
+    async def take(self, key: str) -> float:
+        return float(await self._take(keys=[self.prefix + key], args=[self.per_second, self.burst, self.ttl]))
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class RateLimiter:
+    """Seaux à jetons nommés ; per_minute = 0 désactive la limite"""
+
+    def __init__(self, name: str, per_minute: float, burst: int, maxsize: int = None):
+        self.name = name
+        self.per_second = per_minute / 60
+        self.burst = max(1, burst)
+        self.maxsize = maxsize or settings.RATE_LIMIT_MAX_KEYS
+        self.enabled = settings.RATE_LIMIT_ENABLED and per_minute > 0
+        self._backend = None
+        self._rejected = RATE_LIMITED.labels(name)
+        limiters[name] = self
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            if settings.RATE_LIMIT_BACKEND == "redis":
+                self._backend = RedisBuckets(settings.CACHE_URL, self.per_second, self.burst,
+                                             f"banking:ratelimit:{self.name}:")
+            else:
+                self._backend = MemoryBuckets(self.per_second, self.burst, self.maxsize)
+        return self._backend
+
+    @backend.setter
+    def backend(self, backend):
+        self._backend = backend
+
+    async def check(self, key: str):
+        """Consomme un jeton pour cette clé ou lève TooManyRequests"""
+        try:
+            wait = await self.backend.take(key)
+        except Exception:
+            error_logger.exception("Rate limiter %s unavailable, request allowed", self.name)
+            return
+        if wait:
+            self._rejected.inc()
+            raise TooManyRequests(headers={"Retry-After": str(ceil(wait))})
+
+
+def rate_limited(*rules):
+    """Applique des limites (RateLimiter, fonction request -> clé ou None) avant la route.
+
+    Une clé None n'est pas limitée. Pour une clé par utilisateur, placer sous protected().
+    """
+    def decorator(f):
+        @wraps(f)
+        async def decorated_function(*args, **kwargs):
+            # Fonction de route ou méthode d'une HTTPMethodView (args[0] est alors la vue)
+            request = args[0] if isinstance(args[0], Request) else args[1]
+            for limiter, key_for in rules:
+                if limiter.enabled:
+                    key = key_for(request)
+                    if key is not None:
+                        await limiter.check(key)
+            return await f(*args, **kwargs)
+
+        return decorated_function
+
+    return decorator
+
+
+def client_ip(request) -> str:
+    return request.remote_addr or request.ip
+
+
+def login_email(request):
+    """Email normalisé du corps de /auth/login, lu sans attendre la validation"""
+    try:
+        email = request.json.get("email")
+    except Exception:
+        return None
+    return email.strip().lower() if isinstance(email, str) else None
+
+
+def current_user(request):
+    return getattr(request.ctx, "user_id", None)
+
+
+login_ip_limiter = RateLimiter(
+    "login_ip", settings.LOGIN_RATE_LIMIT_IP_PER_MINUTE, settings.LOGIN_RATE_LIMIT_IP_BURST)
+login_email_limiter = RateLimiter(
+    "login_email", settings.LOGIN_RATE_LIMIT_EMAIL_PER_MINUTE, settings.LOGIN_RATE_LIMIT_EMAIL_BURST)
+transactions_limiter = RateLimiter(
+    "transactions", settings.TRANSACTIONS_RATE_LIMIT_PER_MINUTE, settings.TRANSACTIONS_RATE_LIMIT_BURST)
+
+
+async def stop_rate_limits(app):
+    """Listener after_server_stop : ferme les clients Redis, liés à la boucle du worker"""
+    for limiter in limiters.values():
+        if isinstance(limiter._backend, RedisBuckets):
+            await limiter._backend.close()
+            limiter._backend = None
@@ -1,8 +1,140 @@
+import asyncio
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 import jwt
 from datetime import datetime, timedelta
 from sanic.exceptions import Unauthorized
+from werkzeug.security import generate_password_hash, check_password_hash
+from app.core.cache import Cache
 from app.core.config import settings
+from app.utils.metrics import cache_counters
+
+_hash_executor = None
+_hash_prefix = None
+
+
+class TokenCache:
+    """Cache LRU des jetons déjà vérifiés, indexé par empreinte du jeton.
+
+    Une entrée expire à l'exp du jeton : un jeton servi depuis le cache n'est
+    jamais accepté plus longtemps qu'après un jwt.decode complet. La liste de
+    révocation est dans le backend de cache partagé (CACHE_BACKEND) : une
+    révocation faite dans un worker vaut pour tous, et elle est consultée à
+    chaque requête, jeton en cache ou non. Ses entrées expirent d'elles-mêmes :
+    un jeton révoqué à son exp, un utilisateur après JWT_EXPIRE_MINUTES (les
+    jetons émis avant ont alors expiré).
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._hit_counter, self._miss_counter = cache_counters("tokens")
+        self._entries = OrderedDict()   # empreinte -> (user_id, exp, iat)
+        # Une révocation n'est jamais évincée avant son expiration (evict_live=False)
+        self.revocations = Cache("token_revocations", ttl=settings.JWT_EXPIRE_MINUTES * 60,
+                                 maxsize=settings.TOKEN_REVOCATION_MAX_ENTRIES, evict_live=False)
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def get(self, digest: bytes):
+        """(user_id, iat) d'un jeton déjà vérifié, ou None"""
+        entry = self._entries.get(digest)
+        if entry is None or entry[1] <= time.time():
+            if entry is not None:
+                del self._entries[digest]
+            self.misses += 1
+            self._miss_counter.inc()
+            return None
+        self._entries.move_to_end(digest)
+        self.hits += 1
+        self._hit_counter.inc()
+        return entry[0], entry[2]
+
+    def put(self, digest: bytes, user_id: int, exp: float, issued_at: float):
+        if self.maxsize <= 0:
+            return
+        self._entries[digest] = (user_id, exp, issued_at)
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def is_revoked(self, digest: bytes, user_id: int, issued_at: float) -> bool:
+        revoked, revoked_before = await self.revocations.get_many(
+            f"token:{digest.hex()}", f"user:{user_id}")
+        # Un jeton émis après revoke_user (même dans la même seconde) reste valide
+        return revoked is not None or (revoked_before is not None and issued_at < revoked_before)
+
+    async def revoke(self, digest: bytes, exp: float):
+        self._entries.pop(digest, None)
+        await self.revocations.set(f"token:{digest.hex()}", 1, max(1, math.ceil(exp - time.time())))
+
+    async def revoke_user(self, user_id: int):
+        await self.revocations.set(f"user:{user_id}", time.time())
+        for digest in [key for key, entry in self._entries.items() if entry[0] == user_id]:
+            del self._entries[digest]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE)
+
+
+def _decode(token: str) -> dict:
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"], options={"require": ["exp", "sub"]})
+
+
+async def authenticate(token: str) -> int:
+    """Retourne l'id utilisateur d'un jeton valide, lève Unauthorized sinon"""
+    digest = TokenCache.digest(token)
+    cached = token_cache.get(digest)
+    if cached is not None:
+        user_id, issued_at = cached
+    else:
+        try:
+            payload = _decode(token)
+            user_id = int(payload["sub"])  # Convert to int
+        except jwt.ExpiredSignatureError:
+            raise Unauthorized("Token has expired")
+        except jwt.InvalidTokenError:
+            raise Unauthorized("Invalid token")
+        except ValueError:
+            raise Unauthorized("Invalid user ID format")
+        issued_at = payload.get("iat", 0)
+
+    if await token_cache.is_revoked(digest, user_id, issued_at):
+        raise Unauthorized("Token has been revoked")
+
+    if cached is None:
+        token_cache.put(digest, user_id, payload["exp"], issued_at)
+    return user_id
+
+
+async def revoke_token(token: str):
+    """Révoque un jeton (déconnexion) jusqu'à son expiration"""
+    try:
+        payload = _decode(token)
+    except jwt.InvalidTokenError:
+        return
+    await token_cache.revoke(TokenCache.digest(token), payload["exp"])
+
+
+async def revoke_user_tokens(user_id: int):
+    """Révoque tous les jetons déjà émis pour un utilisateur (compte désactivé, mot de passe changé)"""
+    await token_cache.revoke_user(user_id)
 
 
 def protected():
@@ -14,17 +146,7 @@ def protected():
             if not auth_header or not auth_header.startswith("Bearer "):
                 raise Unauthorized("Missing or invalid authorization header")
 
-            token = auth_header.split(" ")[1]
-
-            try:
-                payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-                request.ctx.user_id = int(payload["sub"])  # Convert to int
-            except jwt.ExpiredSignatureError:
-                raise Unauthorized("Token has expired")
-            except jwt.InvalidTokenError:
-                raise Unauthorized("Invalid token")
-            except ValueError:
-                raise Unauthorized("Invalid user ID format")
+            request.ctx.user_id = await authenticate(auth_header[7:])
 
             return await f(request, *args, **kwargs)
 
@@ -36,7 +158,43 @@ def protected():
 def create_access_token(user_id: int) -> str:
     payload = {
         "exp": datetime.utcnow() + timedelta(minutes=settings.JWT_EXPIRE_MINUTES),
-        "iat": datetime.utcnow(),
+        "iat": time.time(),  # non arrondi : comparé à l'instant exact de revoke_user
         "sub": str(user_id)  # Convert to string for JWT compliance
     }
     return jwt.encode(payload, settings.SECRET_KEY, algorithm="HS256")
+
+
+async def _run_hashing(fn, *args):
+    """Exécute un calcul de hash hors de la boucle d'événements.
+
+    hashlib libère le GIL pendant PBKDF2/scrypt : un pool de threads borné
+    suffit à garder la boucle disponible pour les autres requêtes.
+    """
+    global _hash_executor
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return fn(*args)
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            thread_name_prefix="password-hash"
+        )
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+
+
+async def hash_password(password: str) -> str:
+    return await _run_hashing(generate_password_hash, password, settings.PASSWORD_HASH_METHOD, 16)
+
+
+async def verify_password(password_hash: str, password: str) -> bool:
+    if not password_hash:
+        return False
+    return await _run_hashing(check_password_hash, password_hash, password)
+
+
+async def password_needs_rehash(password_hash: str) -> bool:
+    """Vrai si le hash a été produit avec une autre méthode ou un autre facteur de coût"""
+    global _hash_prefix
+    if _hash_prefix is None:
+        # werkzeug complète la méthode (ex. pbkdf2:sha256 -> pbkdf2:sha256:600000)
+        _hash_prefix = (await hash_password("")).split("$", 1)[0]
+    return password_hash.split("$", 1)[0] != _hash_prefix
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Numeric, Enum, Integer, ForeignKey, Boolean
+from sqlalchemy import Column, String, Numeric, Enum, Integer, ForeignKey, Boolean, BigInteger, Sequence
 from sqlalchemy.orm import relationship
 
 from app.api.schemas import AccountType
@@ -8,7 +8,7 @@ class Account(Base):
     __tablename__ = "accounts"
 
     id = Column(Integer, primary_key=True)
-    account_number = Column(String(20), unique=True, index=True)
+    account_number = Column(String(34), unique=True, index=True)  # IBAN, 34 caractères au plus
     user_id = Column(Integer, ForeignKey("users.id"))
     balance = Column(Numeric(12, 2), default=0.00)
     account_type = Column(Enum(AccountType, values_callable=lambda x: [e.value for e in AccountType]))
@@ -17,11 +17,33 @@ class Account(Base):
     user = relationship("User", back_populates="accounts")
     transactions = relationship("Transaction", back_populates="account")
 
-    def to_dict(self):
+    @classmethod
+    def columns(cls):
+        """Colonnes exposées par l'API, pour lire des tuples sans passer par l'ORM"""
+        return cls.id, cls.account_number, cls.balance, cls.account_type, cls.is_active
+
+    @staticmethod
+    def row_to_dict(row) -> dict:
+        account_id, account_number, balance, account_type, is_active = row
         return {
-            "id": self.id,
-            "account_number": self.account_number,
-            "balance": float(self.balance),
-            "account_type": self.account_type.value,
-            "is_active": self.is_active
-        }
\ No newline at end of file
+            "id": account_id,
+            "account_number": account_number,
+            "balance": f"{balance:.2f}",  # montant exact, pas de float
+            "account_type": account_type.value,
+            "is_active": is_active
+        }
+
+    def to_dict(self):
+        return Account.row_to_dict(
+            (self.id, self.account_number, self.balance, self.account_type, self.is_active))
+
+
+# Numéros de compte : séquence sur PostgreSQL, table compteur ailleurs (SQLite)
+account_number_seq = Sequence("account_number_seq", metadata=Base.metadata)
+
+
+class AccountNumberCounter(Base):
+    __tablename__ = "account_number_counters"
+
+    name = Column(String(50), primary_key=True)
+    next_value = Column(BigInteger, nullable=False)
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, JSON
+
+from app.models.base import Base
+
+
+class AuditEvent(Base):
+    """Journal d'audit en ajout seul : les lignes ne sont jamais modifiées ni supprimées par l'API"""
+    __tablename__ = "audit_events"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    timestamp = Column(DateTime, nullable=False, index=True)
+    event = Column(String(50), nullable=False)
+    user_id = Column(Integer, nullable=True, index=True)
+    account_id = Column(Integer, nullable=True)
+    ip = Column(String(45), nullable=True)
+    data = Column(JSON(none_as_null=True), nullable=True)
+
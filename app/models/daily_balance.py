@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Numeric, Integer, ForeignKey, Date
+
+from app.models.base import Base
+
+
+class AccountDailyBalance(Base):
+    """Agrégat journalier par compte, tenu à jour dans la transaction de chaque écriture"""
+    __tablename__ = "account_daily_balances"
+
+    account_id = Column(Integer, ForeignKey("accounts.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    credits = Column(Numeric(14, 2), nullable=False, default=0)
+    debits = Column(Numeric(14, 2), nullable=False, default=0)
+    tx_count = Column(Integer, nullable=False, default=0)
+    closing_balance = Column(Numeric(12, 2), nullable=False)
+
+    @classmethod
+    def columns(cls):
+        return cls.day, cls.credits, cls.debits, cls.tx_count, cls.closing_balance
+
+    @staticmethod
+    def row_to_dict(row) -> dict:
+        day, credits, debits, tx_count, closing_balance = row
+        return {
+            "day": day.isoformat(),
+            "credits": f"{credits:.2f}",
+            "debits": f"{debits:.2f}",
+            "count": tx_count,
+            "closing_balance": f"{closing_balance:.2f}"
+        }
@@ -1,5 +1,4 @@
-from enum import Enum as PyEnum
-from sqlalchemy import Column, Numeric, Enum, Integer, ForeignKey, DateTime, String
+from sqlalchemy import Column, Numeric, Enum, Integer, ForeignKey, DateTime, String, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -9,24 +8,42 @@ from app.models.base import Base
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Pagination par curseur : WHERE account_id = ? AND (timestamp, id) < (?, ?)
+        Index("ix_transactions_account_timestamp_id", "account_id", "timestamp", "id"),
+    )
 
     id = Column(Integer, primary_key=True)
     account_id = Column(Integer, ForeignKey("accounts.id"))
     amount = Column(Numeric(12, 2))
-    transaction_type = Column(Enum(TransactionType), values_callable=lambda x: [e.value for e in TransactionType])
+    transaction_type = Column(Enum(TransactionType, values_callable=lambda x: [e.value for e in TransactionType]))
     to_account_id = Column(Integer, nullable=True)
     description = Column(String(200), nullable=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
     account = relationship("Account", back_populates="transactions")
 
-    def to_dict(self):
+    @classmethod
+    def columns(cls):
+        """Colonnes exposées par l'API, pour lire des tuples sans passer par l'ORM"""
+        return (cls.id, cls.account_id, cls.amount, cls.transaction_type,
+                cls.to_account_id, cls.description, cls.timestamp)
+
+    @staticmethod
+    def row_to_dict(row) -> dict:
+        """Le timestamp reste un datetime : l'encodeur JSON le formate (app.utils.serialization)"""
+        tx_id, account_id, amount, transaction_type, to_account_id, description, timestamp = row
         return {
-            "id": self.id,
-            "account_id": self.account_id,
-            "amount": float(self.amount),
-            "transaction_type": self.transaction_type.value,
-            "to_account_id": self.to_account_id,
-            "description": self.description,
-            "timestamp": self.timestamp.isoformat()
+            "id": tx_id,
+            "account_id": account_id,
+            "amount": f"{amount:.2f}",  # montant exact, pas de float
+            "transaction_type": transaction_type.value,
+            "to_account_id": to_account_id,
+            "description": description,
+            "timestamp": timestamp
         }
+
+    def to_dict(self):
+        return Transaction.row_to_dict(
+            (self.id, self.account_id, self.amount, self.transaction_type,
+             self.to_account_id, self.description, self.timestamp))
@@ -1,6 +1,7 @@
 from sqlalchemy import Column, Integer, String, Boolean
 from sqlalchemy.orm import relationship
 from werkzeug.security import generate_password_hash, check_password_hash
+from app.core.config import settings
 from app.models.base import Base
 
 
@@ -19,7 +20,7 @@ class User(Base):
     def set_password(self, password):
         self.password_hash = generate_password_hash(
             password,
-            method='pbkdf2:sha256',
+            method=settings.PASSWORD_HASH_METHOD,
             salt_length=16
         )
 
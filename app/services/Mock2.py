@@ -1,7 +1,7 @@
 import pytest
 from unittest.mock import MagicMock, patch
 
-from utils.metrics import MetricsCollector
+from app.utils.metrics import MetricsCollector
 
 
 # ============================================================
@@ -31,8 +31,8 @@ def mock_logger():
 
 @pytest.fixture
 def collector(mock_logger):
-    with patch("utils.metrics.CollectorRegistry"), \
-         patch("utils.metrics.multiprocess.MultiProcessCollector"):
+    with patch("app.utils.metrics.CollectorRegistry"), \
+         patch("app.utils.metrics.multiprocess.MultiProcessCollector"):
         return MetricsCollector(mock_logger)
 
 
@@ -41,8 +41,8 @@ def collector(mock_logger):
 # ============================================================
 
 def test_singleton_returns_same_instance(mock_logger):
-    with patch("utils.metrics.CollectorRegistry"), \
-         patch("utils.metrics.multiprocess.MultiProcessCollector"):
+    with patch("app.utils.metrics.CollectorRegistry"), \
+         patch("app.utils.metrics.multiprocess.MultiProcessCollector"):
 
         collector1 = MetricsCollector(mock_logger)
         collector2 = MetricsCollector(mock_logger)
@@ -51,8 +51,8 @@ def test_singleton_returns_same_instance(mock_logger):
 
 
 def test_singleton_init_called_once(mock_logger):
-    with patch("utils.metrics.CollectorRegistry") as mock_registry, \
-         patch("utils.metrics.multiprocess.MultiProcessCollector"):
+    with patch("app.utils.metrics.CollectorRegistry") as mock_registry, \
+         patch("app.utils.metrics.multiprocess.MultiProcessCollector"):
 
         collector1 = MetricsCollector(mock_logger)
         collector2 = MetricsCollector(mock_logger)
@@ -65,8 +65,8 @@ def test_singleton_keeps_first_logger(mock_logger):
     logger1 = MagicMock()
     logger2 = MagicMock()
 
-    with patch("utils.metrics.CollectorRegistry"), \
-         patch("utils.metrics.multiprocess.MultiProcessCollector"):
+    with patch("app.utils.metrics.CollectorRegistry"), \
+         patch("app.utils.metrics.multiprocess.MultiProcessCollector"):
 
         collector1 = MetricsCollector(logger1)
         collector2 = MetricsCollector(logger2)
@@ -83,7 +83,7 @@ def test_singleton_keeps_first_logger(mock_logger):
 def test_as_response_success(collector, mock_logger):
     fake_metrics = b"fake_metrics_payload"
 
-    with patch("utils.metrics.generate_latest", return_value=fake_metrics) as mock_generate:
+    with patch("app.utils.metrics.generate_latest", return_value=fake_metrics) as mock_generate:
         result = collector.as_response()
 
         mock_generate.assert_called_once_with(collector._registry)
@@ -100,7 +100,7 @@ def test_as_response_success(collector, mock_logger):
 
 
 def test_as_response_failure(collector, mock_logger):
-    with patch("utils.metrics.generate_latest", side_effect=Exception("Boom")):
+    with patch("app.utils.metrics.generate_latest", side_effect=Exception("Boom")):
         with pytest.raises(Exception, match="Boom"):
             collector.as_response()
 
@@ -0,0 +1,80 @@
+import asyncio
+from collections import deque
+
+from sqlalchemy import select, update, insert, func, text
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.core.database import get_engine
+from app.models.account import AccountNumberCounter, account_number_seq
+from app.utils.helpers import generate_account_number
+
+COUNTER_NAME = "accounts"
+
+_reserved = deque()     # numéros réservés par ce worker, pas encore attribués
+_refill_lock = None
+
+
+class AccountNumberService:
+    """Attribution des numéros de compte (IBAN) sans collision.
+
+    Chaque worker réserve un bloc de ACCOUNT_NUMBER_BLOCK_SIZE numéros en un
+    aller-retour (séquence PostgreSQL, table compteur sinon) puis les attribue
+    depuis la mémoire : une création de compte ne fait ni requête
+    supplémentaire ni nouvel essai sur collision. La réservation se fait hors
+    de la transaction de l'appelant : un rollback ne rend pas les numéros, ils
+    sont perdus (trous dans la numérotation), jamais attribués deux fois.
+    """
+
+    @staticmethod
+    async def _reserve_block(size: int) -> list[int]:
+        engine = get_engine()
+        if engine.dialect.name == "postgresql":
+            async with engine.connect() as conn:
+                result = await conn.execute(
+                    select(account_number_seq.next_value())
+                    .select_from(func.generate_series(1, size))
+                )
+                return sorted(result.scalars().all())
+
+        while True:
+            async with engine.begin() as conn:
+                end = (await conn.execute(
+                    update(AccountNumberCounter)
+                    .where(AccountNumberCounter.name == COUNTER_NAME)
+                    .values(next_value=AccountNumberCounter.next_value + size)
+                    .returning(AccountNumberCounter.next_value)
+                )).scalar_one_or_none()
+            if end is not None:
+                return list(range(end - size, end))
+            try:
+                async with engine.begin() as conn:
+                    await conn.execute(insert(AccountNumberCounter).values(
+                        name=COUNTER_NAME, next_value=1 + size))
+                return list(range(1, 1 + size))
+            except IntegrityError:
+                continue  # compteur créé entre-temps par un autre worker
+
+    @staticmethod
+    async def allocate() -> str:
+        """IBAN d'un nouveau compte"""
+        global _refill_lock
+        if not _reserved:
+            if _refill_lock is None:
+                _refill_lock = asyncio.Lock()
+            async with _refill_lock:
+                if not _reserved:
+                    _reserved.extend(await AccountNumberService._reserve_block(
+                        settings.ACCOUNT_NUMBER_BLOCK_SIZE))
+        return generate_account_number(_reserved.popleft())
+
+    @staticmethod
+    async def reset(conn, next_value: int):
+        """Repositionne la numérotation (après un chargement en masse, ex. seed.py)"""
+        _reserved.clear()
+        if conn.dialect.name == "postgresql":
+            await conn.execute(text("SELECT setval('account_number_seq', :value, false)"),
+                               {"value": next_value})
+            return
+        await conn.execute(AccountNumberCounter.__table__.delete())
+        await conn.execute(insert(AccountNumberCounter).values(name=COUNTER_NAME, next_value=next_value))
@@ -1,27 +1,129 @@
 from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sanic.exceptions import BadRequest
+from sanic.log import error_logger
+from app.api.schemas import AccountType
 from app.models.account import Account
-from app.core.database import async_session
+from app.core.audit import audit_after_commit
+from app.core.cache import Cache, MemoryBackend
+from app.core.config import settings
+from app.core.database import after_commit, async_session
+from app.services.account_number_service import AccountNumberService
+from app.utils.exceptions import AccountNotFound
+from app.utils.helpers import is_valid_iban
+
+account_cache = Cache("accounts")
+
+# IBAN -> id, toujours en mémoire du worker : résoudre un bénéficiaire ne coûte
+# pas d'aller-retour réseau. L'association ne change pas une fois le compte créé.
+account_number_cache = Cache("account_numbers")
+account_number_cache.backend = MemoryBackend(settings.ACCOUNT_NUMBER_CACHE_SIZE, settings.ACCOUNT_NUMBER_CACHE_TTL)
 
 
 class AccountService:
 
     @staticmethod
-    async def get_user_accounts(user_id: int):
-        async with async_session() as session:
+    def _cache_key(user_id: int) -> str:
+        return f"accounts:{user_id}"
+
+    @staticmethod
+    async def get_user_accounts(session, user_id: int):
+        """Comptes de l'utilisateur, servis depuis le cache quand c'est possible"""
+        key = AccountService._cache_key(user_id)
+        accounts = await account_cache.get(key)
+        if accounts is None:
+            result = await session.execute(
+                select(*Account.columns()).where(Account.user_id == user_id))
+            accounts = [Account.row_to_dict(row) for row in result.all()]
+            await account_cache.set(key, accounts)
+        return accounts
+
+    @staticmethod
+    async def create_account(session, user_id: int, account_type: str):
+        account = Account(
+            account_number=await AccountNumberService.allocate(),
+            user_id=user_id,
+            account_type=account_type,
+            balance=0.00,
+            is_active=True
+        )
+        session.add(account)
+        await session.flush()
+        AccountService.invalidate_user_accounts(session, user_id)
+        after_commit(session, lambda: account_number_cache.set(account.account_number, account.id))
+        audit_after_commit(session, "account.created", user_id=user_id, account_id=account.id,
+                           account_type=AccountType(account.account_type).value)
+        return account
+
+    @staticmethod
+    def invalidate_user_accounts(session, *user_ids: int):
+        """Invalide la liste des comptes de ces utilisateurs après le commit de la session"""
+        keys = [AccountService._cache_key(user_id) for user_id in set(user_ids)]
+        after_commit(session, lambda: account_cache.delete(*keys))
+
+    @staticmethod
+    def normalize_account_number(account_number: str) -> str:
+        """IBAN sans espaces et en majuscules ; lève BadRequest s'il est invalide"""
+        account_number = account_number.replace(" ", "").upper()
+        if not is_valid_iban(account_number):
+            raise BadRequest("Invalid account number")
+        return account_number
+
+    @staticmethod
+    async def resolve_account_numbers(session, account_numbers) -> dict[str, int]:
+        """id des comptes actifs pour des IBAN normalisés ; les inconnus sont absents.
+
+        Les IBAN absents du cache sont cherchés en une seule requête.
+        """
+        resolved, missing = {}, []
+        for account_number in set(account_numbers):
+            account_id = await account_number_cache.get(account_number)
+            if account_id is None:
+                missing.append(account_number)
+            else:
+                resolved[account_number] = account_id
+
+        if missing:
             result = await session.execute(
-                select(Account).where(Account.user_id == user_id))
-            return result.scalars().all()
+                select(Account.account_number, Account.id)
+                .where(Account.account_number.in_(missing), Account.is_active.is_(True))
+            )
+            for account_number, account_id in result.all():
+                resolved[account_number] = account_id
+                await account_number_cache.set(account_number, account_id)
+        return resolved
 
     @staticmethod
-    async def create_account(user_id: int, account_type: str):
+    async def resolve_account_number(session, account_number: str) -> int:
+        """id du compte actif portant cet IBAN, lève AccountNotFound sinon"""
+        account_number = AccountService.normalize_account_number(account_number)
+        account_id = (await AccountService.resolve_account_numbers(session, [account_number])).get(account_number)
+        if account_id is None:
+            raise AccountNotFound()
+        return account_id
+
+    @staticmethod
+    def invalidate_account_numbers(session, *account_numbers: str):
+        """Retire ces IBAN du cache après le commit (désactivation, clôture de compte)"""
+        after_commit(session, lambda: account_number_cache.delete(*account_numbers))
+
+
+async def warm_account_number_cache(app):
+    """Listener before_server_start : précharge les IBAN des comptes les plus récents.
+
+    Un échec (base pas encore initialisée...) n'empêche pas le démarrage : le
+    cache se remplit alors à la demande.
+    """
+    try:
         async with async_session() as session:
-            account = Account(
-                user_id=user_id,
-                account_type=account_type,
-                balance=0.00,
-                is_active=True
+            result = await session.stream(
+                select(Account.account_number, Account.id)
+                .where(Account.account_number.is_not(None), Account.is_active.is_(True))
+                .order_by(Account.id.desc())
+                .limit(settings.ACCOUNT_NUMBER_CACHE_SIZE)
+                .execution_options(yield_per=1000)
             )
-            session.add(account)
-            await session.commit()
-            await session.refresh(account)
-            return account
+            async for account_number, account_id in result:
+                await account_number_cache.backend.set(account_number, account_id)
+    except SQLAlchemyError:
+        error_logger.exception("Failed to warm the account number cache")
@@ -1,52 +1,56 @@
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sanic.exceptions import Unauthorized, BadRequest
+from app.core.audit import audit_log, audit_after_commit
 from app.models.user import User
-from app.core.database import async_session
-from app.core.security import create_access_token
+from app.core.security import create_access_token, hash_password, verify_password, password_needs_rehash
 
 
 class AuthService:
 
     @staticmethod
-    async def register_user(email: str, password: str, first_name: str, last_name: str):
-        async with async_session() as session:
-            existing_user = await session.execute(
-                select(User).where(User.email == email)
-            )
-            if existing_user.scalar_one_or_none():
-                raise BadRequest("Email already registered")
-
-            # Crée un nouvel utilisateur
-            user = User(
-                email=email,
-                first_name=first_name,
-                last_name=last_name
-            )
-            user.set_password(password)
-
-            session.add(user)
-            await session.commit()
-            await session.refresh(user)
-
-            return user
+    async def register_user(session, email: str, password: str, first_name: str, last_name: str):
+        # Crée un nouvel utilisateur ; l'unicité de l'email est garantie par la contrainte
+        user = User(
+            email=email,
+            first_name=first_name,
+            last_name=last_name
+        )
+        user.password_hash = await hash_password(password)
+
+        session.add(user)
+        try:
+            await session.flush()
+        except IntegrityError:
+            raise BadRequest("Email already registered")
+
+        audit_after_commit(session, "user.registered", user_id=user.id)
+        return user
 
     @staticmethod
-    async def login_user(email: str, password: str):
-        async with async_session() as session:
-            user = await session.execute(
-                select(User).where(User.email == email)
-            )
-            user = user.scalar_one_or_none()
-
-            if not user or not user.verify_password(password):
-                raise Unauthorized("Invalid credentials")
-
-            if not user.is_active:
-                raise Unauthorized("Account is disabled")
-
-            token = create_access_token(user.id)
-
-            return {
-                "token": token,
-                "user": user
-            }
+    async def login_user(session, email: str, password: str, ip: str = None):
+        user = await session.execute(
+            select(User).where(User.email == email)
+        )
+        user = user.scalar_one_or_none()
+
+        if not user or not await verify_password(user.password_hash, password):
+            audit_log.emit("login.failed", user_id=user.id if user else None, ip=ip,
+                           email=email, reason="invalid_credentials")
+            raise Unauthorized("Invalid credentials")
+
+        if not user.is_active:
+            audit_log.emit("login.failed", user_id=user.id, ip=ip, email=email, reason="disabled")
+            raise Unauthorized("Account is disabled")
+
+        if await password_needs_rehash(user.password_hash):
+            # Le mot de passe en clair n'est disponible qu'ici : migration transparente
+            user.password_hash = await hash_password(password)
+
+        token = create_access_token(user.id)
+        audit_log.emit("login.succeeded", user_id=user.id, ip=ip)
+
+        return {
+            "token": token,
+            "user": user
+        }
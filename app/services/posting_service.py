@@ -0,0 +1,237 @@
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import select, update, insert, case, func, or_
+from sanic.exceptions import BadRequest, SanicException
+
+from app.api.schemas import TransactionType
+from app.core.audit import audit_after_commit
+from app.core.config import settings
+from app.models.account import Account
+from app.models.transaction import Transaction
+from app.services.account_service import AccountService
+from app.services.rollup_service import RollupService
+from app.utils.exceptions import (AccountNotFound, InsufficientFunds, SameAccountTransfer, InvalidAmount,
+                                  BalanceLimitExceeded)
+from app.utils.helpers import to_money, MAX_AMOUNT
+
+
+class PostingService:
+    """Moteur de passation des écritures.
+
+    Une écriture verrouille les comptes concernés (SELECT ... FOR UPDATE, par id
+    croissant pour éviter les interblocages), contrôle la provision, met à jour
+    tous les soldes en un seul UPDATE, insère la transaction puis reporte les
+    mouvements dans les agrégats journaliers (RollupService). Les appels
+    doivent se faire dans une transaction ouverte par l'appelant : débit et
+    crédit sont validés ou annulés ensemble.
+
+    Quand user_id est fourni, le contrôle d'appartenance du compte débité est
+    intégré à la requête de verrouillage : pas d'aller-retour supplémentaire.
+    """
+
+    @staticmethod
+    def to_amount(amount) -> Decimal:
+        """Montant au centime ; InvalidAmount (400) s'il devrait être arrondi ou ne tient pas en Numeric(12, 2)"""
+        try:
+            return to_money(amount)
+        except ValueError as exc:
+            raise InvalidAmount(str(exc))
+
+    @staticmethod
+    def compute_deltas(account_id: int, amount: Decimal, transaction_type: str,
+                       to_account_id: int = None) -> dict[int, Decimal]:
+        """Variation de solde par compte pour une écriture"""
+        transaction_type = TransactionType(transaction_type)
+        if transaction_type is not TransactionType.TRANSFER and to_account_id is not None:
+            raise BadRequest("to_account_id is only allowed for transfers")
+        if transaction_type is TransactionType.DEPOSIT:
+            return {account_id: amount}
+        if transaction_type is TransactionType.WITHDRAWAL:
+            return {account_id: -amount}
+
+        if to_account_id is None:
+            raise BadRequest("to_account_id is required for transfers")
+        if to_account_id == account_id:
+            raise SameAccountTransfer()
+        return {account_id: -amount, to_account_id: amount}
+
+    @staticmethod
+    async def lock_accounts(session, account_ids, user_id: int = None,
+                            source_id: int = None) -> tuple[dict[int, Decimal], dict[int, int]]:
+        """Verrouille les comptes actifs dans l'ordre des id.
+
+        Retourne les soldes et les propriétaires des comptes verrouillés. Si user_id
+        est fourni, source_id n'est retenu que s'il appartient à cet utilisateur.
+        """
+        query = select(Account.id, Account.balance, Account.user_id).where(
+            Account.id.in_(sorted(account_ids)), Account.is_active.is_(True))
+        if user_id is not None:
+            query = query.where(or_(Account.id != source_id, Account.user_id == user_id))
+
+        result = await session.execute(query.order_by(Account.id).with_for_update())
+        balances, owners = {}, {}
+        for account_id, balance, owner_id in result.all():
+            balances[account_id] = balance
+            owners[account_id] = owner_id
+        return balances, owners
+
+    @staticmethod
+    async def apply_deltas(session, deltas: dict[int, Decimal], owners: dict[int, int]):
+        """Applique toutes les variations de solde en une seule requête"""
+        await session.execute(
+            update(Account)
+            .where(Account.id.in_(deltas))
+            .values(balance=Account.balance + case(deltas, value=Account.id))
+            .execution_options(synchronize_session=False)
+        )
+        AccountService.invalidate_user_accounts(session, *(owners[account_id] for account_id in deltas))
+
+    @staticmethod
+    def check_funds(balances: dict[int, Decimal], deltas: dict[int, Decimal]):
+        for account_id, delta in deltas.items():
+            if account_id not in balances:
+                raise AccountNotFound()
+            if delta < 0 and balances[account_id] + delta < 0:
+                raise InsufficientFunds()
+            if delta > 0 and balances[account_id] + delta > MAX_AMOUNT:
+                raise BalanceLimitExceeded()
+
+    @staticmethod
+    async def post(
+            session,
+            account_id: int,
+            amount,
+            transaction_type: str,
+            to_account_id: int = None,
+            description: str = None,
+            user_id: int = None
+    ) -> Transaction:
+        """Passe une écriture et retourne la transaction créée"""
+        amount = PostingService.to_amount(amount)
+        transaction_type = TransactionType(transaction_type)
+        deltas = PostingService.compute_deltas(account_id, amount, transaction_type, to_account_id)
+
+        balances, owners = await PostingService.lock_accounts(session, deltas, user_id, account_id)
+        PostingService.check_funds(balances, deltas)
+        await PostingService.apply_deltas(session, deltas, owners)
+
+        now = datetime.utcnow()
+        transaction = Transaction(
+            account_id=account_id,
+            amount=amount,
+            transaction_type=transaction_type,
+            to_account_id=to_account_id,
+            description=description,
+            timestamp=now
+        )
+        session.add(transaction)
+        await session.flush()
+        await RollupService.record(
+            session, now.date(), RollupService.accumulate({}, deltas),
+            {acc: balances[acc] + delta for acc, delta in deltas.items()})
+        audit_after_commit(session, "transaction.posted", user_id=user_id, account_id=account_id,
+                           transaction_id=transaction.id, transaction_type=transaction_type.value,
+                           amount=str(amount), to_account_id=to_account_id)
+        return transaction
+
+    @staticmethod
+    async def post_many(session, account_id: int, items, user_id: int = None) -> list[dict]:
+        """Passe un lot d'écritures sur un compte et retourne un résultat par élément.
+
+        Les éléments sont évalués dans l'ordre sur des soldes courants : un élément
+        refusé (provision insuffisante, compte cible introuvable...) n'empêche pas
+        les suivants. Tous les comptes touchés sont verrouillés en une requête,
+        les variations sont agrégées par compte en un seul UPDATE et les lignes
+        acceptées sont insérées en une seule instruction multi-lignes.
+        """
+        results, planned = [], []
+        for index, item in enumerate(items):
+            try:
+                amount = PostingService.to_amount(item.amount)
+                deltas = PostingService.compute_deltas(
+                    account_id, amount, item.transaction_type, item.to_account_id)
+            except SanicException as exc:
+                results.append({"index": index, "status": "rejected", "error": str(exc)})
+                continue
+            planned.append((index, item, amount, deltas))
+
+        involved = {account_id} | {acc for *_, deltas in planned for acc in deltas}
+        balances, owners = await PostingService.lock_accounts(session, involved, user_id, account_id)
+        if account_id not in balances:
+            raise AccountNotFound()
+        running = dict(balances)
+
+        now = datetime.utcnow()
+        accepted, rows, movements = [], [], {}
+        for index, item, amount, deltas in planned:
+            try:
+                PostingService.check_funds(running, deltas)
+            except SanicException as exc:
+                results.append({"index": index, "status": "rejected", "error": str(exc)})
+                continue
+            for acc, delta in deltas.items():
+                running[acc] += delta
+            RollupService.accumulate(movements, deltas)
+            accepted.append(index)
+            rows.append({
+                "account_id": account_id,
+                "amount": amount,
+                "transaction_type": TransactionType(item.transaction_type),
+                "to_account_id": item.to_account_id,
+                "description": item.description,
+                "timestamp": now,
+            })
+
+        if rows:
+            totals = {acc: running[acc] - balances[acc] for acc in running if running[acc] != balances[acc]}
+            if totals:
+                await PostingService.apply_deltas(session, totals, owners)
+            ids = await PostingService.insert_transactions(session, rows)
+            await RollupService.record(session, now.date(), movements, running)
+            # Un événement par lot plutôt qu'un par écriture
+            audit_after_commit(session, "transactions.posted", user_id=user_id, account_id=account_id,
+                               count=len(ids), transaction_ids=list(ids))
+            results.extend(
+                {"index": index, "status": "created", "id": tx_id}
+                for index, tx_id in zip(accepted, ids)
+            )
+
+        results.sort(key=lambda result: result["index"])
+        return results
+
+    @staticmethod
+    async def insert_transactions(session, rows: list[dict]) -> list[int]:
+        """Insère des transactions en masse et retourne leurs id dans l'ordre des lignes.
+
+        Avec asyncpg, au-delà de TRANSACTIONS_BULK_COPY_THRESHOLD lignes, les id sont
+        réservés sur la séquence en une requête puis les lignes envoyées par COPY.
+        Sinon un INSERT multi-lignes (executemany) avec RETURNING est utilisé.
+        """
+        connection = await session.connection()
+        if (connection.dialect.driver == "asyncpg"
+                and len(rows) >= settings.TRANSACTIONS_BULK_COPY_THRESHOLD):
+            result = await session.execute(
+                select(func.nextval("transactions_id_seq"))
+                .select_from(func.generate_series(1, len(rows)))
+            )
+            ids = sorted(result.scalars().all())
+            raw = await connection.get_raw_connection()
+            columns = ["id", "account_id", "amount", "transaction_type",
+                       "to_account_id", "description", "timestamp"]
+            await raw.driver_connection.copy_records_to_table(
+                Transaction.__tablename__,
+                columns=columns,
+                records=[
+                    (tx_id, row["account_id"], row["amount"], row["transaction_type"].value,
+                     row["to_account_id"], row["description"], row["timestamp"])
+                    for tx_id, row in zip(ids, rows)
+                ]
+            )
+            return ids
+
+        result = await session.execute(
+            insert(Transaction).returning(Transaction.id, sort_by_parameter_order=True),
+            rows
+        )
+        return result.scalars().all()
@@ -0,0 +1,160 @@
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import select, delete, insert, func, literal, union_all, Date
+
+from app.api.schemas import TransactionType
+from app.models.account import Account
+from app.models.daily_balance import AccountDailyBalance
+from app.models.transaction import Transaction
+from app.utils.exceptions import AccountNotFound
+
+ZERO = Decimal("0.00")
+
+
+def _insert_for(session):
+    """INSERT avec clause ON CONFLICT propre au dialecte de la session"""
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise NotImplementedError(f"Daily rollups are not supported on {dialect}")
+    return dialect_insert(AccountDailyBalance)
+
+
+class RollupService:
+    """Agrégats journaliers par compte (crédits, débits, nombre, solde de clôture).
+
+    Les agrégats sont mis à jour par le moteur d'écritures, dans la même
+    transaction que l'écriture : un relevé se lit en O(jours) sans parcourir
+    la table des transactions.
+    """
+
+    @staticmethod
+    def accumulate(movements: dict, deltas: dict[int, Decimal]) -> dict:
+        """Ajoute les variations d'une écriture aux mouvements du jour, par compte"""
+        for account_id, delta in deltas.items():
+            movement = movements.setdefault(
+                account_id, {"credits": ZERO, "debits": ZERO, "tx_count": 0})
+            if delta >= 0:
+                movement["credits"] += delta
+            else:
+                movement["debits"] -= delta
+            movement["tx_count"] += 1
+        return movements
+
+    @staticmethod
+    async def record(session, day: date, movements: dict, balances: dict[int, Decimal]):
+        """Reporte les mouvements dans les agrégats du jour (un seul INSERT ... ON CONFLICT).
+
+        balances donne le solde de chaque compte après l'écriture ; il devient
+        le solde de clôture du jour. Les comptes étant verrouillés par
+        l'appelant, le dernier écrivain est bien le plus récent.
+        """
+        if not movements:
+            return
+        stmt = _insert_for(session)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AccountDailyBalance.account_id, AccountDailyBalance.day],
+            set_={
+                "credits": AccountDailyBalance.credits + stmt.excluded.credits,
+                "debits": AccountDailyBalance.debits + stmt.excluded.debits,
+                "tx_count": AccountDailyBalance.tx_count + stmt.excluded.tx_count,
+                "closing_balance": stmt.excluded.closing_balance,
+            }
+        )
+        await session.execute(stmt, [
+            {"account_id": account_id, "day": day, "closing_balance": balances[account_id], **movement}
+            for account_id, movement in sorted(movements.items())
+        ])
+
+    @staticmethod
+    async def get_balance_history(session, user_id: int, account_id: int, start: date, end: date) -> dict:
+        """Relevé journalier d'un compte de l'utilisateur entre start et end inclus.
+
+        Le solde d'ouverture est la clôture du dernier jour actif avant start.
+        Seuls les jours avec des mouvements sont listés.
+        """
+        owned = (await session.execute(
+            select(Account.id).where(Account.id == account_id, Account.user_id == user_id)
+        )).scalar_one_or_none()
+        if owned is None:
+            raise AccountNotFound()
+
+        opening = (await session.execute(
+            select(AccountDailyBalance.closing_balance)
+            .where(AccountDailyBalance.account_id == account_id, AccountDailyBalance.day < start)
+            .order_by(AccountDailyBalance.day.desc())
+            .limit(1)
+        )).scalar_one_or_none() or ZERO
+
+        result = await session.execute(
+            select(*AccountDailyBalance.columns())
+            .where(AccountDailyBalance.account_id == account_id,
+                   AccountDailyBalance.day.between(start, end))
+            .order_by(AccountDailyBalance.day)
+        )
+        days = [AccountDailyBalance.row_to_dict(row) for row in result.all()]
+
+        return {
+            "account_id": account_id,
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "opening_balance": f"{opening:.2f}",
+            "closing_balance": days[-1]["closing_balance"] if days else f"{opening:.2f}",
+            "days": days
+        }
+
+    @staticmethod
+    async def rebuild(session, batch_size: int = 1000) -> int:
+        """Recalcule tous les agrégats depuis la table des transactions.
+
+        Sert à l'initialisation d'une base existante (seed, migration). Les
+        soldes de clôture sont déduits à rebours du solde courant des comptes.
+        Retourne le nombre de lignes écrites.
+        """
+        day = func.date(Transaction.timestamp, type_=Date)
+        debit_side = select(
+            Transaction.account_id.label("account_id"), day.label("day"),
+            literal(ZERO).label("credit"), Transaction.amount.label("debit")
+        ).where(Transaction.transaction_type.in_([TransactionType.WITHDRAWAL, TransactionType.TRANSFER]))
+        deposit_side = select(
+            Transaction.account_id, day, Transaction.amount, literal(ZERO)
+        ).where(Transaction.transaction_type == TransactionType.DEPOSIT)
+        credit_side = select(
+            Transaction.to_account_id, day, Transaction.amount, literal(ZERO)
+        ).where(Transaction.transaction_type == TransactionType.TRANSFER,
+                Transaction.to_account_id.is_not(None))
+        movements = union_all(debit_side, deposit_side, credit_side).subquery()
+
+        daily = await session.execute(
+            select(movements.c.account_id, movements.c.day,
+                   func.sum(movements.c.credit), func.sum(movements.c.debit), func.count())
+            .group_by(movements.c.account_id, movements.c.day)
+            .order_by(movements.c.account_id, movements.c.day.desc())
+        )
+        balances = dict((await session.execute(select(Account.id, Account.balance))).all())
+
+        await session.execute(delete(AccountDailyBalance))
+        closing, rows, written = {}, [], 0
+        for account_id, day_, credits, debits, tx_count in daily.all():
+            if account_id not in balances:
+                continue
+            if account_id not in closing:
+                closing[account_id] = Decimal(balances[account_id] or 0)
+            credits, debits = Decimal(credits or 0), Decimal(debits or 0)
+            rows.append({
+                "account_id": account_id, "day": day_, "credits": credits,
+                "debits": debits, "tx_count": tx_count, "closing_balance": closing[account_id]
+            })
+            # Clôture de la veille = clôture du jour moins ses mouvements
+            closing[account_id] -= credits - debits
+            if len(rows) >= batch_size:
+                await session.execute(insert(AccountDailyBalance), rows)
+                written, rows = written + len(rows), []
+        if rows:
+            await session.execute(insert(AccountDailyBalance), rows)
+            written += len(rows)
+        return written
@@ -1,52 +1,139 @@
-from sqlalchemy import select
-from sanic.exceptions import NotFound
+from sqlalchemy import select, tuple_
+from sanic.exceptions import BadRequest, NotFound
 from app.models.transaction import Transaction
 from app.models.account import Account
+from app.utils.exceptions import AccountNotFound
 from app.core.database import async_session
+from app.services.account_service import AccountService
+from app.services.posting_service import PostingService
 
 
 class TransactionService:
 
     @staticmethod
-    async def verify_account_ownership(user_id: int, account_id: int):
+    async def verify_account_ownership(session, user_id: int, account_id: int):
         """Vérifie que le compte appartient à l'utilisateur"""
-        async with async_session() as session:
-            result = await session.execute(
-                select(Account)
-                .where((Account.id == account_id) & (Account.user_id == user_id))
-            )
-            if not result.scalar_one_or_none():
-                raise NotFound("Account not found")
+        result = await session.execute(
+            select(Account.id)
+            .where((Account.id == account_id) & (Account.user_id == user_id))
+        )
+        if not result.scalar_one_or_none():
+            raise NotFound("Account not found")
+
+    @staticmethod
+    def _history_query(account_id: int):
+        return (
+            select(*Transaction.columns())
+            .where(Transaction.account_id == account_id)
+            .order_by(Transaction.timestamp.desc(), Transaction.id.desc())
+        )
+
+    @staticmethod
+    async def get_transactions(session, user_id: int, account_id: int, limit: int, cursor: tuple = None):
+        """Récupère une page de transactions, du plus récent au plus ancien.
+
+        La pagination se fait par curseur (keyset) sur (timestamp, id) : le coût
+        d'une page ne dépend pas de sa position dans l'historique. Le contrôle
+        d'appartenance est fait dans la même requête ; il n'est refait à part
+        que pour distinguer une page vide d'un compte inconnu.
+        Retourne (transactions sérialisables, dernière position) ; la position
+        vaut None lorsqu'il n'y a pas de page suivante.
+        """
+        query = (
+            TransactionService._history_query(account_id)
+            .join(Account, Account.id == Transaction.account_id)
+            .where(Account.user_id == user_id)
+            .limit(limit + 1)
+        )
+        if cursor is not None:
+            query = query.where(tuple_(Transaction.timestamp, Transaction.id) < cursor)
+
+        result = await session.execute(query)
+        rows = result.all()
+
+        if not rows:
+            await TransactionService.verify_account_ownership(session, user_id, account_id)
+        last = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = (rows[-1].timestamp, rows[-1].id)
+        return [Transaction.row_to_dict(row) for row in rows], last
 
     @staticmethod
-    async def get_transactions(account_id: int):
-        """Récupère toutes les transactions d'un compte"""
+    async def stream_transactions(account_id: int, batch_size: int):
+        """Parcourt tout l'historique d'un compte par lots de dicts via un curseur serveur.
+
+        Utilise sa propre session : le curseur doit survivre à l'envoi des
+        en-têtes, moment où la session de la requête est fermée.
+        """
         async with async_session() as session:
-            result = await session.execute(
-                select(Transaction)
-                .where(Transaction.account_id == account_id)
-                .order_by(Transaction.timestamp.desc())
+            result = await session.stream(
+                TransactionService._history_query(account_id)
+                .execution_options(yield_per=batch_size)
             )
-            return result.scalars().all()
+            async for batch in result.partitions():
+                yield [Transaction.row_to_dict(row) for row in batch]
 
     @staticmethod
     async def create_transaction(
+            session,
+            user_id: int,
             account_id: int,
             amount: float,
             transaction_type: str,
             to_account_id: int = None,
-            description: str = None
+            description: str = None,
+            to_account_number: str = None
     ):
-        """Crée une nouvelle transaction"""
-        async with async_session() as session:
-            transaction = Transaction(
-                account_id=account_id,
-                amount=amount,
-                transaction_type=transaction_type,
-                to_account_id=to_account_id,
-                description=description
-            )
-            session.add(transaction)
-            await session.commit()
-            await session.refresh(transaction)
-            return transaction
+        """Crée une transaction et met à jour les soldes de façon atomique.
+
+        Le compte destinataire d'un virement peut être désigné par son IBAN.
+        """
+        if to_account_number is not None:
+            to_account_id = await AccountService.resolve_account_number(session, to_account_number)
+        return await PostingService.post(
+            session,
+            account_id=account_id,
+            amount=amount,
+            transaction_type=transaction_type,
+            to_account_id=to_account_id,
+            description=description,
+            user_id=user_id
+        )
+
+    @staticmethod
+    async def create_transactions_bulk(session, user_id: int, account_id: int, items):
+        """Crée un lot de transactions en une seule transaction base de données.
+
+        Les IBAN destinataires sont résolus ensemble avant la passation ; un
+        élément dont l'IBAN est invalide ou inconnu est refusé seul.
+        """
+        numbers = {}
+        for index, item in enumerate(items):
+            if item.to_account_number is not None:
+                try:
+                    numbers[index] = AccountService.normalize_account_number(item.to_account_number)
+                except BadRequest as exc:
+                    numbers[index] = exc
+        if not numbers:
+            return await PostingService.post_many(session, account_id, items, user_id=user_id)
+
+        resolved = await AccountService.resolve_account_numbers(
+            session, [number for number in numbers.values() if isinstance(number, str)])
+        results, postable, positions = [], [], []
+        for index, item in enumerate(items):
+            if index in numbers:
+                target = resolved.get(numbers[index]) if isinstance(numbers[index], str) else None
+                if target is None:
+                    error = numbers[index] if isinstance(numbers[index], BadRequest) else AccountNotFound()
+                    results.append({"index": index, "status": "rejected", "error": str(error)})
+                    continue
+                item = item.model_copy(update={"to_account_id": target})
+            postable.append(item)
+            positions.append(index)
+
+        for result in await PostingService.post_many(session, account_id, postable, user_id=user_id):
+            result["index"] = positions[result["index"]]
+            results.append(result)
+        results.sort(key=lambda result: result["index"])
+        return results
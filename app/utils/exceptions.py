@@ -1,8 +1,17 @@
-class AccountNotFound(Exception):
-    pass
+from sanic.exceptions import BadRequest, NotFound
 
-class InsufficientFunds(Exception):
-    pass
 
-class SameAccountTransfer(Exception):
-    pass
+class AccountNotFound(NotFound):
+    message = "Account not found"
+
+class InsufficientFunds(BadRequest):
+    message = "Insufficient funds"
+
+class SameAccountTransfer(BadRequest):
+    message = "Cannot transfer to the same account"
+
+class InvalidAmount(BadRequest):
+    message = "Invalid amount"
+
+class BalanceLimitExceeded(BadRequest):
+    message = "Balance limit exceeded"
@@ -1,4 +1,78 @@
-import random
+import base64
+import binascii
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
 
-def generate_account_number() -> str:
-    return ''.join([str(random.randint(0, 9)) for _ in range(16)])
+from app.core.config import settings
+
+CENT = Decimal("0.01")
+MAX_AMOUNT = Decimal("9999999999.99")  # Numeric(12, 2) des montants et des soldes
+
+
+def _iban_digits(value: str) -> str:
+    """Lettres converties en nombres (A=10 ... Z=35), comme pour le calcul IBAN"""
+    return "".join(str(int(char, 36)) for char in value.upper())
+
+
+def rib_key(bank_code: str, branch_code: str, account: str) -> str:
+    """Clé RIB française (2 chiffres) pour des codes numériques"""
+    return f"{97 - (89 * int(bank_code) + 15 * int(branch_code) + 3 * int(account)) % 97:02d}"
+
+
+def iban_check_digits(country: str, bban: str) -> str:
+    return f"{98 - int(_iban_digits(bban + country + '00')) % 97:02d}"
+
+
+def is_valid_iban(iban: str) -> bool:
+    iban = iban.replace(" ", "").upper()
+    if not 15 <= len(iban) <= 34 or not iban.isalnum():
+        return False
+    return int(_iban_digits(iban[4:] + iban[:4])) % 97 == 1
+
+
+def generate_account_number(number: int) -> str:
+    """IBAN du compte numéro number (banque et guichet de la configuration).
+
+    Le numéro est fourni par l'allocateur (AccountNumberService) : deux
+    comptes ne peuvent pas recevoir le même IBAN.
+    """
+    account = f"{number:011d}"
+    bban = settings.IBAN_BANK_CODE + settings.IBAN_BRANCH_CODE + account + rib_key(
+        settings.IBAN_BANK_CODE, settings.IBAN_BRANCH_CODE, account)
+    return settings.IBAN_COUNTRY + iban_check_digits(settings.IBAN_COUNTRY, bban) + bban
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """Encode une position (timestamp, id) en curseur opaque pour la pagination"""
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Décode un curseur produit par encode_cursor, lève ValueError s'il est invalide"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, row_id = raw.split("|")
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (binascii.Error, UnicodeDecodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def to_money(amount) -> Decimal:
+    """Convertit un montant (float, str, Decimal) en Decimal au centime.
+
+    Lève ValueError plutôt que d'arrondir : plus de deux décimales, montant
+    nul ou négatif, ou au-delà de MAX_AMOUNT.
+    """
+    try:
+        value = Decimal(str(amount))
+        money = value.quantize(CENT)
+    except InvalidOperation as exc:
+        raise ValueError("Amount must be a number") from exc
+    if money != value:
+        raise ValueError("Amount must have at most 2 decimal places")
+    if money <= 0:
+        raise ValueError("Amount must be greater than 0")
+    if money > MAX_AMOUNT:
+        raise ValueError(f"Amount must not exceed {MAX_AMOUNT}")
+    return money
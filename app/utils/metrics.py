@@ -0,0 +1,161 @@
+"""Métriques Prometheus de l'API.
+
+Avec plusieurs workers, PROMETHEUS_MULTIPROC_DIR doit désigner un répertoire
+(de préférence sur tmpfs) avant l'import de prometheus_client : chaque worker
+y écrit ses valeurs dans des fichiers mmap, agrégés à la lecture de /metrics
+par MultiProcessCollector. server.py prépare ce répertoire au lancement.
+
+Les métriques ne sont enregistrées dans aucun registre global : le registre
+est construit par MetricsCollector. Les enfants étiquetés sont résolus une fois
+puis réutilisés, l'enregistrement coûte quelques microsecondes par requête.
+"""
+import os
+import time
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from prometheus_client import CONTENT_TYPE_LATEST
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+REQUEST_LATENCY = Histogram(
+    "banking_http_request_duration_seconds", "Durée de traitement des requêtes HTTP",
+    ["method", "route", "status"], registry=None
+)
+DB_QUERY_LATENCY = Histogram(
+    "banking_db_query_duration_seconds", "Durée d'exécution des requêtes SQL",
+    ["operation"], registry=None,
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, float("inf"))
+)
+DB_POOL_WAIT = Histogram(
+    "banking_db_pool_wait_seconds", "Attente d'une connexion du pool", registry=None,
+    buckets=(.0001, .0005, .001, .005, .01, .05, .1, .5, 1.0, 5.0, float("inf"))
+)
+DB_POOL_TIMEOUTS = Counter(
+    "banking_db_pool_timeouts", "Attentes de connexion ayant expiré", registry=None
+)
+CACHE_LOOKUPS = Counter(
+    "banking_cache_lookups", "Consultations des caches", ["cache", "result"], registry=None
+)
+AUDIT_EVENTS = Counter(
+    "banking_audit_events", "Événements d'audit par issue (written, dropped, failed)",
+    ["result"], registry=None
+)
+RATE_LIMITED = Counter(
+    "banking_rate_limited", "Requêtes refusées par limitation de débit", ["limiter"], registry=None
+)
+WORKERS = Gauge(
+    "banking_workers", "Workers en cours d'exécution", registry=None, multiprocess_mode="livesum"
+)
+
+_METRICS = (REQUEST_LATENCY, DB_QUERY_LATENCY, DB_POOL_WAIT, DB_POOL_TIMEOUTS, CACHE_LOOKUPS, AUDIT_EVENTS, RATE_LIMITED, WORKERS)
+
+_request_children = {}  # (method, route, status) -> enfant de REQUEST_LATENCY
+_query_children = {}    # opération SQL -> enfant de DB_QUERY_LATENCY
+
+
+class MetricsLogger:
+    """Adapte un logger standard à l'interface start/success/error du collecteur"""
+
+    def __init__(self, logger):
+        self._logger = logger
+
+    def start(self, message, *args):
+        self._logger.debug(message, *args)
+
+    def success(self, message, *args):
+        self._logger.debug(message, *args)
+
+    def error(self, message, *args):
+        self._logger.error(message, *args)
+
+
+class MetricsCollector:
+    """Registre des métriques exposées par /metrics (singleton par processus)"""
+
+    _instance = None
+    content_type = CONTENT_TYPE_LATEST
+
+    def __new__(cls, logger):
+        if cls._instance is None:
+            instance = super().__new__(cls)
+            instance.logger = logger
+            instance._registry = CollectorRegistry()
+            if MULTIPROCESS:
+                multiprocess.MultiProcessCollector(instance._registry)
+            else:
+                for metric in _METRICS:
+                    instance._registry.register(metric)
+            cls._instance = instance
+        return cls._instance
+
+    def as_response(self) -> bytes:
+        """Sérialise les métriques au format texte Prometheus"""
+        self.logger.start("Generating Prometheus metrics payload")
+        try:
+            payload = generate_latest(self._registry)
+        except Exception as exc:
+            self.logger.error("Metrics generation failed: %s", exc)
+            raise
+        self.logger.success("Metrics generated - %d bytes", len(payload))
+        return payload
+
+
+def cache_counters(name: str):
+    """Compteurs (hit, miss) pré-résolus pour un cache"""
+    return CACHE_LOOKUPS.labels(name, "hit"), CACHE_LOOKUPS.labels(name, "miss")
+
+
+async def start_request_timer(request):
+    """Middleware requête : à enregistrer avant les autres pour tout mesurer"""
+    request.ctx.metrics_start = time.perf_counter()
+
+
+async def observe_request(request, response):
+    """Middleware réponse : une observation par (méthode, route, statut).
+
+    La route est le motif (/transactions/<account_id:int>), pas le chemin :
+    le nombre de séries reste borné.
+    """
+    start = getattr(request.ctx, "metrics_start", None)
+    if start is None:
+        return
+    route = "/" + request.route.path if request.route else "unmatched"
+    key = (request.method, route, response.status if response is not None else 500)
+    child = _request_children.get(key)
+    if child is None:
+        child = _request_children[key] = REQUEST_LATENCY.labels(*key)
+    child.observe(time.perf_counter() - start)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_start
+    operation = statement.split(None, 1)[0][:16].upper()
+    child = _query_children.get(operation)
+    if child is None:
+        child = _query_children[operation] = DB_QUERY_LATENCY.labels(operation)
+    child.observe(elapsed)
+
+
+def instrument_sqlalchemy():
+    """Chronomètre toutes les requêtes SQL de tous les moteurs du processus"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+async def worker_started(app):
+    """Listener before_server_start"""
+    WORKERS.inc()
+
+
+async def worker_stopped(app):
+    """Listener after_server_stop : retire les séries « live » de ce worker"""
+    WORKERS.dec()
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,32 @@
+"""Encodage JSON rapide des réponses de l'API.
+
+orjson est utilisé s'il est installé (datetime natifs, sortie directe en
+bytes), sinon ujson, déjà requis par Sanic.
+"""
+from datetime import datetime
+
+from sanic.response import HTTPResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    import ujson
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+if orjson is not None:
+    def dumps(value) -> bytes:
+        return orjson.dumps(value)
+else:
+    def dumps(value) -> bytes:
+        return ujson.dumps(value, ensure_ascii=False, default=_default).encode()
+
+
+def json_response(value, status: int = 200, headers: dict = None) -> HTTPResponse:
+    return HTTPResponse(dumps(value), status=status, headers=headers, content_type="application/json")
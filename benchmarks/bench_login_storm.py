@@ -0,0 +1,78 @@
+"""Latence d'un endpoint sans rapport (GET /) pendant une rafale de connexions.
+
+Démarre server.py (un worker) sur une base SQLite temporaire, une fois avec le
+hachage des mots de passe dans la boucle d'événements (PASSWORD_HASH_WORKERS=0)
+puis avec le pool de threads, et compare le p99 de GET / pendant la rafale.
+
+    python -m benchmarks.bench_login_storm --logins 200 --concurrency 32
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.common import running_server, summarize, print_summary
+
+EMAIL, PASSWORD = "storm@example.com", "storm-password"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--ping-interval", type=float, default=0.01, help="secondes entre deux GET /")
+    parser.add_argument("--hash-workers", type=int, default=4)
+    return parser.parse_args()
+
+
+async def storm(base_url: str, args) -> dict:
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        await client.post("/auth/register", json={
+            "email": EMAIL, "password": PASSWORD, "first_name": "Storm", "last_name": "Login"})
+
+        remaining = args.logins
+        login_latencies, ping_latencies = [], []
+        done = asyncio.Event()
+
+        async def login_worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                await client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+                login_latencies.append(time.perf_counter() - start)
+
+        async def pinger():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/")
+                ping_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(args.ping_interval)
+
+        ping_task = asyncio.create_task(pinger())
+        start = time.perf_counter()
+        await asyncio.gather(*(login_worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await ping_task
+
+    return {"login": summarize(login_latencies, elapsed), "ping": summarize(ping_latencies, elapsed)}
+
+
+def main(args):
+    for hash_workers in (0, args.hash_workers):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {"DB_URL": f"sqlite+aiosqlite:///{Path(tmp) / 'storm.db'}",
+                   "WORKERS": "1", "PASSWORD_HASH_WORKERS": str(hash_workers)}
+            with running_server(env) as base_url:
+                results = asyncio.run(storm(base_url, args))
+        label = "inline" if hash_workers == 0 else f"{hash_workers} hash threads"
+        print_summary(f"[{label}] POST /auth/login", results["login"])
+        print_summary(f"[{label}] GET / during storm", results["ping"])
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,98 @@
+"""Sérialisation d'une liste de transactions : chemin ORM historique contre tuples.
+
+Charge --rows transactions dans une base SQLite en mémoire puis compare :
+- l'ancien chemin : objets ORM, to_dict() avec float()/isoformat(), json() de Sanic ;
+- le nouveau : tuples de colonnes, montants en chaînes exactes, encodage direct en bytes.
+
+    python -m benchmarks.bench_serialization --rows 10000
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+os.environ.setdefault("DB_URL", "sqlite+aiosqlite://")
+
+from sanic import json
+from sqlalchemy import insert, select
+
+from app.core.database import get_engine, dispose_engine, async_session
+from app.models.base import Base
+from app.models.user import User
+from app.models.account import Account, AccountType
+from app.models.transaction import Transaction, TransactionType
+from app.utils.serialization import json_response
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    return parser.parse_args()
+
+
+def legacy_to_dict(tx):
+    return {
+        "id": tx.id,
+        "account_id": tx.account_id,
+        "amount": float(tx.amount),
+        "transaction_type": tx.transaction_type.value,
+        "to_account_id": tx.to_account_id,
+        "description": tx.description,
+        "timestamp": tx.timestamp.isoformat()
+    }
+
+
+async def legacy_path(query):
+    async with async_session() as session:
+        transactions = (await session.execute(query)).scalars().all()
+        return json([legacy_to_dict(tx) for tx in transactions]).body
+
+
+async def fast_path(query):
+    async with async_session() as session:
+        rows = (await session.execute(query)).all()
+        return json_response([Transaction.row_to_dict(row) for row in rows]).body
+
+
+async def setup(rows: int):
+    async with get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [{"id": 1, "email": "bench@example.com", "password_hash": "!"}])
+        await conn.execute(insert(Account), [{"id": 1, "user_id": 1, "balance": Decimal("0.00"),
+                                              "account_type": AccountType.CHECKING}])
+        start = datetime(2024, 1, 1)
+        await conn.execute(insert(Transaction), [
+            {"account_id": 1, "amount": Decimal(i % 100000) / 100, "transaction_type": TransactionType.DEPOSIT,
+             "description": f"Settlement {i}", "timestamp": start + timedelta(seconds=i)}
+            for i in range(rows)
+        ])
+
+
+async def measure(path, query, repeat: int) -> float:
+    await path(query)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await path(query)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def main(args):
+    await setup(args.rows)
+    legacy_query = select(Transaction).where(Transaction.account_id == 1).order_by(Transaction.timestamp.desc())
+    fast_query = select(*Transaction.columns()).where(Transaction.account_id == 1).order_by(Transaction.timestamp.desc())
+
+    legacy = await measure(legacy_path, legacy_query, args.repeat)
+    fast = await measure(fast_path, fast_query, args.repeat)
+    print(f"{args.rows} rows, best of {args.repeat}")
+    print(f"legacy (ORM + to_dict + json):  {legacy * 1000:.1f} ms")
+    print(f"fast (tuples + bytes encoder):  {fast * 1000:.1f} ms  (x{legacy / fast:.1f})")
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
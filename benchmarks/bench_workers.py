@@ -0,0 +1,99 @@
+"""Débit (requêtes/s) de server.py en fonction du nombre de workers.
+
+Démarre le serveur avec WORKERS=1, 2, 4... sur une base SQLite temporaire (ou
+DB_URL si elle est définie) et le charge pendant une durée fixe depuis
+plusieurs processus clients, pour que le générateur de charge ne soit pas le
+goulot. Par défaut la cible est GET /accounts/ authentifié (jeton, session,
+cache des comptes).
+
+    python -m benchmarks.bench_workers --workers 1 2 4 8 --duration 10 --clients 4
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import httpx
+
+from benchmarks.common import running_server, summarize, print_summary
+
+EMAIL, PASSWORD = "workers@example.com", "workers-password"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--path", default="/accounts/")
+    parser.add_argument("--duration", type=float, default=10.0, help="secondes de charge par palier")
+    parser.add_argument("--clients", type=int, default=os.cpu_count() or 1, help="processus générateurs de charge")
+    parser.add_argument("--concurrency", type=int, default=32, help="requêtes simultanées par processus client")
+    return parser.parse_args()
+
+
+async def prepare(base_url: str) -> str:
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        await client.post("/auth/register", json={
+            "email": EMAIL, "password": PASSWORD, "first_name": "Load", "last_name": "Test"})
+        response = await client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+        token = response.json()["token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        await client.post("/accounts/", json={"account_type": "CHECKING"}, headers=headers)
+        return token
+
+
+async def load(base_url: str, path: str, token: str, duration: float, concurrency: int):
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=30, limits=limits,
+                                 headers={"Authorization": f"Bearer {token}"}) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.get(path)
+                if response.status_code != 200:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors
+
+
+def client_process(base_url, path, token, duration, concurrency):
+    return asyncio.run(load(base_url, path, token, duration, concurrency))
+
+
+def run_step(base_url: str, args) -> tuple[dict, int]:
+    token = asyncio.run(prepare(base_url))
+    client_process(base_url, args.path, token, 1.0, args.concurrency)  # préchauffage
+    with ProcessPoolExecutor(args.clients) as pool:
+        start = time.perf_counter()
+        futures = [pool.submit(client_process, base_url, args.path, token, args.duration, args.concurrency)
+                   for _ in range(args.clients)]
+        results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+    latencies = [latency for step, _ in results for latency in step]
+    return summarize(latencies, elapsed), sum(errors for _, errors in results)
+
+
+def main(args):
+    baseline = None
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {"WORKERS": str(workers), "ACCESS_LOG": "false"}
+            if "DB_URL" not in os.environ:
+                env["DB_URL"] = f"sqlite+aiosqlite:///{Path(tmp) / 'workers.db'}"
+            with running_server(env) as base_url:
+                summary, errors = run_step(base_url, args)
+        baseline = baseline or summary["throughput"]
+        print_summary(f"[{workers} worker(s)] GET {args.path}", summary)
+        print(f"    speedup x{summary['throughput'] / baseline:.2f}, errors={errors}")
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,77 @@
+"""Utilitaires partagés par les scripts de benchmark"""
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed: float) -> dict:
+    """Débit et percentiles de latence (en millisecondes)"""
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "throughput": len(values) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "max_ms": (values[-1] if values else 0.0) * 1000,
+    }
+
+
+def print_summary(title: str, summary: dict):
+    print(f"{title}: {summary['requests']} ops, {summary['throughput']:.1f} ops/s, "
+          f"p50={summary['p50_ms']:.2f}ms p95={summary['p95_ms']:.2f}ms "
+          f"p99={summary['p99_ms']:.2f}ms max={summary['max_ms']:.2f}ms")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def running_server(env: dict, port: int = None, timeout: float = 30.0):
+    """Lance server.py dans un sous-processus et attend qu'il accepte les connexions.
+
+    env complète l'environnement courant (DB_URL, WORKERS...) ; le schéma est
+    créé au préalable avec init_db.py. La limitation de débit est désactivée
+    sauf si env la réactive : les scénarios envoient beaucoup de requêtes
+    depuis une seule IP. Retourne l'URL de base du serveur.
+    """
+    port = port or free_port()
+    env = {**os.environ, "HOST": "127.0.0.1", "PORT": str(port), "DEBUG": "false",
+           "RATE_LIMIT_ENABLED": "false", **env}
+    subprocess.run([sys.executable, "init_db.py"], cwd=ROOT, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    process = subprocess.Popen([sys.executable, "server.py"], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+                break
+            except OSError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("server did not start")
+                time.sleep(0.2)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
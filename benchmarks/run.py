@@ -0,0 +1,202 @@
+"""Suite de benchmarks des chemins critiques de l'API.
+
+Démarre server.py (create_app) sur une base SQLite temporaire, ou sur DB_URL si
+elle est définie (PostgreSQL de test), puis enchaîne les scénarios :
+
+    login       POST /auth/login
+    accounts    GET  /accounts/
+    tx_list     GET  /transactions/<id>
+    tx_create   POST /transactions/<id>
+
+Pour chacun : débit, latences p50/p95/p99, taux d'erreur et nombre de requêtes
+SQL par requête HTTP (différence du compteur banking_db_query_duration_seconds
+de /metrics avant et après le scénario). Les résultats sont écrits en JSON
+dans benchmarks/results/ avec le commit courant ; --compare affiche l'écart
+avec un résultat précédent.
+
+    python -m benchmarks.run --concurrency 32 --requests 2000
+    python -m benchmarks.run --compare latest
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from benchmarks.common import ROOT, running_server, summarize, print_summary
+
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+SCENARIOS = ("login", "accounts", "tx_list", "tx_create")
+PASSWORD = "bench-password"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000, help="requêtes par scénario")
+    parser.add_argument("--login-requests", type=int, default=100,
+                        help="requêtes du scénario login (hachage volontairement coûteux)")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--history", type=int, default=200, help="transactions préexistantes par compte")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--output", type=Path, help="fichier de résultats (par défaut benchmarks/results/)")
+    parser.add_argument("--compare", help="résultat de référence : chemin d'un fichier JSON ou 'latest'")
+    parser.add_argument("--no-save", action="store_true")
+    return parser.parse_args()
+
+
+def git_revision() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+async def db_queries(client: httpx.AsyncClient) -> float:
+    """Total des requêtes SQL exécutées par tous les workers depuis leur démarrage"""
+    response = await client.get("/metrics")
+    return sum(
+        float(line.rsplit(" ", 1)[1])
+        for line in response.text.splitlines()
+        if line.startswith("banking_db_query_duration_seconds_count")
+    )
+
+
+async def prepare(client: httpx.AsyncClient, args) -> list[dict]:
+    """Crée les utilisateurs, leurs comptes et un historique de transactions"""
+    users = []
+    for index in range(args.users):
+        email = f"bench-{index}@example.com"
+        await client.post("/auth/register", json={
+            "email": email, "password": PASSWORD, "first_name": "Bench", "last_name": f"User{index}"})
+        response = await client.post("/auth/login", json={"email": email, "password": PASSWORD})
+        headers = {"Authorization": f"Bearer {response.json()['token']}"}
+        account = (await client.post("/accounts/", json={"account_type": "CHECKING"}, headers=headers)).json()
+        if args.history:
+            await client.post(f"/transactions/{account['id']}/batch", headers=headers, json={
+                "transactions": [{"amount": 10, "transaction_type": "DEPOSIT", "description": f"seed {i}"}
+                                 for i in range(args.history)]})
+        users.append({"email": email, "headers": headers, "account_id": account["id"]})
+    return users
+
+
+def request_for(scenario: str, user: dict, sequence: int) -> dict:
+    if scenario == "login":
+        return {"method": "POST", "url": "/auth/login",
+                "json": {"email": user["email"], "password": PASSWORD}}
+    if scenario == "accounts":
+        return {"method": "GET", "url": "/accounts/", "headers": user["headers"]}
+    if scenario == "tx_list":
+        return {"method": "GET", "url": f"/transactions/{user['account_id']}?limit=50", "headers": user["headers"]}
+    return {"method": "POST", "url": f"/transactions/{user['account_id']}", "headers": user["headers"],
+            "json": {"amount": 1, "transaction_type": "DEPOSIT", "description": f"bench {sequence}"}}
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: str, users: list[dict], args) -> dict:
+    queries_before = await db_queries(client)
+    counter = itertools.count()
+    total = args.login_requests if scenario == "login" else args.requests
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        while (sequence := next(counter)) < total:
+            request = request_for(scenario, users[sequence % len(users)], sequence)
+            start = time.perf_counter()
+            response = await client.request(**request)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+    queries = await db_queries(client) - queries_before
+
+    result = summarize(latencies, elapsed)
+    result.update(errors=errors, db_queries_per_request=queries / len(latencies) if latencies else 0.0)
+    return result
+
+
+async def run_suite(base_url: str, args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        users = await prepare(client, args)
+        results = {}
+        for scenario in args.scenarios:
+            results[scenario] = await run_scenario(client, scenario, users, args)
+            print_summary(scenario, results[scenario])
+            print(f"    errors={results[scenario]['errors']} "
+                  f"db_queries/request={results[scenario]['db_queries_per_request']:.2f}")
+        return results
+
+
+def load_baseline(reference: str):
+    if reference == "latest":
+        files = sorted(RESULTS_DIR.glob("*.json"))
+        if not files:
+            return None
+        reference = files[-1]
+    with open(reference) as f:
+        return json.load(f)
+
+
+def compare(results: dict, baseline: dict):
+    print(f"\ncompared with {(baseline['git']['commit'] or 'unknown')[:10]} ({baseline['timestamp']})")
+    for scenario, current in results.items():
+        previous = baseline["results"].get(scenario)
+        if previous is None:
+            continue
+        changes = []
+        for key in ("throughput", "p50_ms", "p95_ms", "p99_ms", "db_queries_per_request"):
+            if previous.get(key):
+                changes.append(f"{key} {(current[key] - previous[key]) / previous[key] * 100:+.1f}%")
+        print(f"{scenario}: " + ", ".join(changes))
+
+
+def main(args):
+    baseline = load_baseline(args.compare) if args.compare else None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {"WORKERS": str(args.workers), "ACCESS_LOG": "false"}
+        if "DB_URL" not in os.environ:
+            env["DB_URL"] = f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}"
+        with running_server(env) as base_url:
+            results = asyncio.run(run_suite(base_url, args))
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count(), "database": "DB_URL" if "DB_URL" in os.environ else "sqlite"},
+        "parameters": {key: getattr(args, key) for key in
+                       ("concurrency", "requests", "login_requests", "users", "history", "workers")},
+        "results": results,
+    }
+    if not args.no_save:
+        output = args.output
+        if output is None:
+            RESULTS_DIR.mkdir(exist_ok=True)
+            commit = (report["git"]["commit"] or "nogit")[:10]
+            output = RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{commit}.json"
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nresults written to {output}")
+    if baseline is not None:
+        compare(results, baseline)
+
+
+if __name__ == "__main__":
+    main(parse_args())
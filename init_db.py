@@ -1,11 +1,30 @@
+"""Crée les tables manquantes.
+
+    python init_db.py                    # création du schéma
+    python init_db.py --rebuild-rollups  # et recalcul des agrégats journaliers (account_daily_balances)
+
+--rebuild-rollups sert après une mise à jour sur une base existante : les
+écritures antérieures aux agrégats sont reportées depuis la table des
+transactions, sans quoi /balance-history est vide ou partiel pour les
+anciens comptes.
+"""
+import argparse
 import asyncio
-from app.core.database import engine
+from app.core.database import get_engine, dispose_engine, get_db
 from app.models.base import Base
+from app.services.rollup_service import RollupService
 
-async def init_db():
-    async with engine.begin() as conn:
+async def init_db(rebuild_rollups: bool = False):
+    async with get_engine().begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     print("Base de données créée avec succès!")
+    if rebuild_rollups:
+        async with get_db() as session:
+            written = await RollupService.rebuild(session)
+        print(f"{written} agrégats journaliers recalculés")
+    await dispose_engine()
 
 if __name__ == "__main__":
-    asyncio.run(init_db())
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rebuild-rollups", action="store_true")
+    asyncio.run(init_db(parser.parse_args().rebuild_rollups))
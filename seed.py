@@ -1,84 +1,281 @@
+"""Génération de données synthétiques pour le développement et les tests de charge.
+
+Réinitialise le schéma puis écrit utilisateurs, comptes, transactions et
+agrégats journaliers par lots (COPY avec asyncpg, INSERT multi-lignes sinon) :
+la mémoire utilisée ne dépend pas du volume généré. Les données sont
+déterministes : même graine et même --end donnent la même base.
+
+Distributions : quelques comptes « chauds » concentrent une part des
+écritures, l'activité croît vers la date de fin et baisse le week-end, les
+montants suivent une loi log-normale, une part des écritures sont des
+virements entre comptes. Un débit qui rendrait le solde négatif devient un
+dépôt.
+
+Un hash de mot de passe est calculé par profil (client, admin), pas par
+utilisateur : client<N>@banque.com / motdepasse, admin@banque.com / admin123.
+
+    python seed.py                                    # petite base de démonstration
+    python seed.py --users 1000000 --transactions 20000000 --batch-size 50000
+"""
+import argparse
 import asyncio
-from sqlalchemy import insert, delete
-from app.core.database import engine
+import math
+import random
+import time
+from array import array
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import insert, update, bindparam, text
+from werkzeug.security import generate_password_hash
+
+from app.api.schemas import AccountType, TransactionType
+from app.core.config import settings
+from app.core.database import get_engine, dispose_engine
 from app.models.base import Base
 from app.models.user import User
-from app.models.account import Account, AccountType
-from app.models.transaction import Transaction, TransactionType
-from datetime import datetime, timedelta
+from app.models.account import Account
+from app.models.transaction import Transaction
+from app.models.daily_balance import AccountDailyBalance
+from app.services.account_number_service import AccountNumberService
+from app.utils.helpers import generate_account_number
 
+PASSWORDS = {"client": "motdepasse", "admin": "admin123"}
+FIRST_NAMES = ["Jean", "Marie", "Pierre", "Sophie", "Luc", "Camille", "Paul", "Julie", "Louis", "Emma"]
+LAST_NAMES = ["Dupont", "Martin", "Bernard", "Durand", "Petit", "Moreau", "Laurent", "Simon", "Michel", "Lefebvre"]
+ACCOUNT_TYPES = [AccountType.CHECKING.value, AccountType.SAVINGS.value, AccountType.CREDIT.value]
+DESCRIPTIONS = {
+    TransactionType.DEPOSIT.value: ["Salaire", "Dépôt espèces", "Remboursement", "Virement reçu"],
+    TransactionType.WITHDRAWAL.value: ["Retrait DAB", "Carte bancaire", "Prélèvement", "Frais bancaires"],
+    TransactionType.TRANSFER.value: ["Virement", "Virement mensuel", "Épargne", "Loyer"],
+}
 
-async def seed_data():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
-        await conn.run_sync(Base.metadata.create_all)
+USER_COLUMNS = ["id", "email", "password_hash", "first_name", "last_name", "is_active"]
+ACCOUNT_COLUMNS = ["id", "account_number", "user_id", "balance", "account_type", "is_active"]
+TRANSACTION_COLUMNS = ["id", "account_id", "amount", "transaction_type", "to_account_id", "description", "timestamp"]
+ROLLUP_COLUMNS = ["account_id", "day", "credits", "debits", "tx_count", "closing_balance"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--transactions", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=365, help="période couverte par les transactions")
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today(), help="dernier jour (AAAA-MM-JJ)")
+    parser.add_argument("--hot-accounts", type=int, default=10)
+    parser.add_argument("--hot-ratio", type=float, default=0.2, help="part des écritures sur un compte chaud")
+    parser.add_argument("--transfer-ratio", type=float, default=0.3)
+    parser.add_argument("--growth", type=float, default=3.0, help="activité du dernier jour / activité du premier")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def cents(value: int) -> Decimal:
+    return Decimal(value).scaleb(-2)
+
+
+class BulkWriter:
+    """Tampon de lignes par table, écrit par lots dans sa propre transaction.
+
+    Avant d'écrire un lot, les tampons des tables qu'il référence (clés
+    étrangères) sont vidés : une ligne n'est jamais écrite avant sa cible.
+    """
+
+    def __init__(self, engine, batch_size: int):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.use_copy = engine.dialect.driver == "asyncpg"
+        self.buffers = {}
+        self.written = {}
+
+    async def add(self, table, columns: list[str], row: tuple):
+        buffer = self.buffers.setdefault(table.name, (table, columns, []))[2]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            await self.flush(table.name)
+
+    async def flush(self, name: str = None):
+        for table_name in [name] if name else list(self.buffers):
+            table, columns, rows = self.buffers[table_name]
+            if not rows:
+                continue
+            for parent in {key.column.table.name for key in table.foreign_keys} - {table_name}:
+                if parent in self.buffers:
+                    await self.flush(parent)
+            async with self.engine.begin() as conn:
+                if self.use_copy:
+                    raw = await conn.get_raw_connection()
+                    await raw.driver_connection.copy_records_to_table(table.name, columns=columns, records=rows)
+                else:
+                    await conn.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+            self.written[table_name] = self.written.get(table_name, 0) + len(rows)
+            rows.clear()
+
+
+def day_weights(args) -> list[float]:
+    """Poids d'activité par jour : croissance vers --end, creux le week-end"""
+    start = args.end - timedelta(days=args.days - 1)
+    weights = []
+    for offset in range(args.days):
+        trend = args.growth ** (offset / max(1, args.days - 1))
+        weekend = (start + timedelta(days=offset)).weekday() >= 5
+        weights.append(trend * (0.5 if weekend else 1.0))
+    return weights
 
-    users = [
-        {
-            "email": "client1@banque.com",
-            "password_hash": generate_password_hash("motdepasse"),
-            "first_name": "Jean",
-            "last_name": "Dupont",
-            "is_active": True
-        },
-        {
-            "email": "client2@banque.com",
-            "password_hash": generate_password_hash("motdepasse"),
-            "first_name": "Marie",
-            "last_name": "Martin",
-            "is_active": True
-        },
-        {
-            "email": "admin@banque.com",
-            "password_hash": generate_password_hash("admin123"),
-            "first_name": "Admin",
-            "last_name": "System",
-            "is_active": True
-        }
-    ]
-
-    accounts = [
-        {"account_number": "FR7630001007941234567890185", "user_id": 1, "balance": 1500.00,
-         "account_type": AccountType.CHECKING.value, "is_active": True},
-        {"account_number": "FR7630001007949876543210186", "user_id": 1, "balance": 5000.00,
-         "account_type": AccountType.SAVINGS.value, "is_active": True},
-        {"account_number": "FR7630001007945555555550187", "user_id": 2, "balance": 300.00,
-         "account_type": AccountType.CHECKING.value, "is_active": True},
-        {"account_number": "FR7630001007949999999990188", "user_id": 3, "balance": 10000.00,
-         "account_type": AccountType.CREDIT.value, "is_active": True}
-    ]
-
-    transactions = [
-        {"account_id": 1, "amount": 100.00, "transaction_type": TransactionType.DEPOSIT.value,
-         "description": "Dépôt initial", "timestamp": datetime.now() - timedelta(days=2)},
-        {"account_id": 1, "amount": 50.00, "transaction_type": TransactionType.WITHDRAWAL.value,
-         "description": "Retrait DAB", "timestamp": datetime.now() - timedelta(days=1)},
-        {"account_id": 2, "amount": 200.00, "transaction_type": TransactionType.TRANSFER.value,
-         "to_account_id": 1, "description": "Virement mensuel", "timestamp": datetime.now()},
-        {"account_id": 4, "amount": 1000.00, "transaction_type": TransactionType.DEPOSIT.value,
-         "description": "Dépôt admin", "timestamp": datetime.now() - timedelta(hours=1)}
-    ]
 
+def daily_counts(args, rng: random.Random) -> list[int]:
+    """Répartit --transactions entre les jours selon day_weights"""
+    weights = day_weights(args)
+    total = sum(weights)
+    counts = [math.floor(args.transactions * weight / total) for weight in weights]
+    for index in rng.choices(range(args.days), weights=weights, k=args.transactions - sum(counts)):
+        counts[index] += 1
+    return counts
+
+
+async def write_users(writer: BulkWriter, args, rng: random.Random):
+    hashes = {tier: generate_password_hash(password, method=settings.PASSWORD_HASH_METHOD, salt_length=16)
+              for tier, password in PASSWORDS.items()}
+    await writer.add(User.__table__, USER_COLUMNS,
+                     (1, "admin@banque.com", hashes["admin"], "Admin", "System", True))
+    for user_id in range(2, args.users + 1):
+        await writer.add(User.__table__, USER_COLUMNS, (
+            user_id, f"client{user_id - 1}@banque.com", hashes["client"],
+            rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), True))
+
+
+async def write_accounts(writer: BulkWriter, args, rng: random.Random) -> int:
+    """Un à trois comptes par utilisateur, soldes à zéro (mis à jour à la fin)"""
+    account_id = 0
+    for user_id in range(1, args.users + 1):
+        count = 1 + (rng.random() < 0.4) + (rng.random() < 0.1)
+        for account_type in ACCOUNT_TYPES[:count]:
+            account_id += 1
+            await writer.add(Account.__table__, ACCOUNT_COLUMNS, (
+                account_id, generate_account_number(account_id), user_id, Decimal("0.00"), account_type, True))
+    return account_id
+
+
+async def write_activity(writer: BulkWriter, args, rng: random.Random, account_count: int) -> array:
+    """Transactions dans l'ordre chronologique et agrégats journaliers.
+
+    Les soldes (en centimes) sont tenus dans un tableau de la taille du nombre
+    de comptes ; seuls les mouvements du jour en cours sont gardés en mémoire.
+    """
+    balances = array("q", bytes(8 * (account_count + 1)))
+    hot = rng.sample(range(1, account_count + 1), min(args.hot_accounts, account_count))
+    start = args.end - timedelta(days=args.days - 1)
+
+    def pick_account():
+        if hot and rng.random() < args.hot_ratio:
+            return rng.choice(hot)
+        return rng.randint(1, account_count)
+
+    tx_id = 0
+    for offset, count in enumerate(daily_counts(args, rng)):
+        day = start + timedelta(days=offset)
+        midnight = datetime.combine(day, datetime.min.time())
+        # Heures concentrées en journée, triées pour un historique chronologique
+        seconds = sorted(rng.triangular(6, 23, 13) * 3600 for _ in range(count))
+        movements = {}  # compte -> [crédits, débits, nombre] du jour, en centimes
+
+        for second in seconds:
+            tx_id += 1
+            account_id = pick_account()
+            amount = max(1, int(rng.lognormvariate(3.5, 1.2) * 100))
+            roll = rng.random()
+            to_account_id = None
+            if roll < args.transfer_ratio and account_count > 1:
+                kind = TransactionType.TRANSFER.value
+                to_account_id = pick_account()
+                while to_account_id == account_id:
+                    to_account_id = rng.randint(1, account_count)
+            elif roll < args.transfer_ratio + (1 - args.transfer_ratio) / 2:
+                kind = TransactionType.WITHDRAWAL.value
+            else:
+                kind = TransactionType.DEPOSIT.value
+            if kind != TransactionType.DEPOSIT.value and balances[account_id] < amount:
+                kind, to_account_id = TransactionType.DEPOSIT.value, None
+
+            source = movements.setdefault(account_id, [0, 0, 0])
+            source[2] += 1
+            if kind == TransactionType.DEPOSIT.value:
+                balances[account_id] += amount
+                source[0] += amount
+            else:
+                balances[account_id] -= amount
+                source[1] += amount
+            if to_account_id is not None:
+                balances[to_account_id] += amount
+                target = movements.setdefault(to_account_id, [0, 0, 0])
+                target[0] += amount
+                target[2] += 1
+
+            await writer.add(Transaction.__table__, TRANSACTION_COLUMNS, (
+                tx_id, account_id, cents(amount), kind, to_account_id,
+                rng.choice(DESCRIPTIONS[kind]), midnight + timedelta(seconds=second)))
+
+        for account_id in sorted(movements):
+            credits, debits, tx_count = movements[account_id]
+            await writer.add(AccountDailyBalance.__table__, ROLLUP_COLUMNS, (
+                account_id, day, cents(credits), cents(debits), tx_count, cents(balances[account_id])))
+
+    return balances
+
+
+async def update_balances(engine, balances: array, batch_size: int):
+    statement = (
+        update(Account)
+        .where(Account.id == bindparam("account_id_"))
+        .values(balance=bindparam("balance_"))
+    )
+    for first in range(1, len(balances), batch_size):
+        last = min(len(balances), first + batch_size)
+        rows = [{"account_id_": account_id, "balance_": cents(balances[account_id])}
+                for account_id in range(first, last) if balances[account_id]]
+        if rows:
+            async with engine.begin() as conn:
+                await conn.execute(statement, rows)
+
+
+async def reset_sequences(engine, account_count: int):
+    """Les id et numéros de compte sont fixés par le générateur : repositionne les séquences"""
     async with engine.begin() as conn:
-        await conn.execute(delete(Transaction))
-        await conn.execute(delete(Account))
-        await conn.execute(delete(User))
+        await AccountNumberService.reset(conn, account_count + 1)
+        if engine.dialect.name != "postgresql":
+            return
+        for table in ("users", "accounts", "transactions"):
+            await conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"))
 
-        await conn.execute(insert(User), users)
-        await conn.execute(insert(Account), accounts)
-        await conn.execute(insert(Transaction), transactions)
 
-        print("Base de données réinitialisée avec succès!")
-        print(f"{len(users)} utilisateurs créés")
-        print(f"{len(accounts)} comptes créés")
-        print(f"{len(transactions)} transactions créées")
+async def seed_data(args):
+    rng = random.Random(args.seed)
+    engine = get_engine()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
 
+    started = time.perf_counter()
+    writer = BulkWriter(engine, args.batch_size)
+    await write_users(writer, args, rng)
+    account_count = await write_accounts(writer, args, rng)
+    await writer.flush()  # les transactions référencent les comptes
+    balances = await write_activity(writer, args, rng, account_count)
+    await writer.flush()
+    await update_balances(engine, balances, args.batch_size)
+    await reset_sequences(engine, account_count)
+    await dispose_engine()
 
-def generate_password_hash(password):
-    """Génère un hash cohérent pour tous les mots de passe"""
-    from werkzeug.security import generate_password_hash
-    return generate_password_hash(password, method='pbkdf2:sha256', salt_length=16)
+    print("Base de données réinitialisée avec succès!")
+    print(f"{writer.written.get('users', 0)} utilisateurs créés")
+    print(f"{writer.written.get('accounts', 0)} comptes créés")
+    print(f"{writer.written.get('transactions', 0)} transactions créées")
+    print(f"{writer.written.get('account_daily_balances', 0)} agrégats journaliers calculés")
+    print(f"en {time.perf_counter() - started:.1f}s")
 
 
 if __name__ == "__main__":
-    asyncio.run(seed_data())
\ No newline at end of file
+    asyncio.run(seed_data(parse_args()))
@@ -1,12 +1,53 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+
+def prepare_metrics_dir():
+    """Répertoire des métriques multiprocessus, partagé par les workers.
+
+    Doit être fixé avant l'import de prometheus_client. Sans
+    PROMETHEUS_MULTIPROC_DIR, un répertoire temporaire est créé sur tmpfs
+    (/dev/shm) ; un répertoire fourni est vidé des fichiers d'un lancement
+    précédent.
+    """
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            if name.endswith(".db"):
+                os.remove(os.path.join(path, name))
+        return
+    path = tempfile.mkdtemp(prefix="banking-metrics-", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+
+
+if __name__ == "__main__":
+    # Processus principal uniquement : les workers héritent de la variable
+    prepare_metrics_dir()
+
+from sanic.log import logger
+
 from app import create_app
 from app.core.config import settings
 
 app = create_app()
 
 if __name__ == "__main__":
+    # Un processus par worker : chacun crée son moteur, son pool (DB_MAX_CONNECTIONS
+    # réparti entre les workers) et ses caches dans before_server_start. À l'arrêt
+    # ou au rechargement, les requêtes en cours ont GRACEFUL_SHUTDOWN_TIMEOUT
+    # secondes pour se terminer.
+    if settings.WORKERS > 1 and settings.CACHE_BACKEND != "redis":
+        logger.warning("WORKERS=%d with CACHE_BACKEND=%s: account and Idempotency-Key caches "
+                       "are per worker; use CACHE_BACKEND=redis", settings.WORKERS, settings.CACHE_BACKEND)
     app.run(
         host=settings.HOST,
         port=settings.PORT,
         debug=settings.DEBUG,
-        auto_reload=settings.DEBUG
-    )
\ No newline at end of file
+        auto_reload=settings.DEBUG,
+        workers=settings.WORKERS,
+        access_log=settings.ACCESS_LOG
+    )
@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# Avant tout import de app.core.config : base SQLite jetable, pas d'effets de bord
+os.environ["DB_URL"] = "sqlite+aiosqlite:///" + os.path.join(tempfile.mkdtemp(prefix="banking-tests-"), "test.db")
+os.environ["CACHE_BACKEND"] = "memory"
+os.environ["AUDIT_SINK"] = "none"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from app.core.database import get_db, get_engine, dispose_engine
+from app.core.cache import MemoryBackend
+from app.models.base import Base
+from app.models.user import User
+from app.services.account_service import AccountService, account_cache
+from app.services.posting_service import PostingService
+
+
+class StandInBackend(MemoryBackend):
+    """Backend local à la place d'un backend partagé : compte les lectures et invalidations"""
+
+    def __init__(self):
+        super().__init__(maxsize=100, ttl=60)
+        self.reads = 0
+        self.deleted = []
+
+    async def get(self, key):
+        self.reads += 1
+        return await super().get(key)
+
+    async def delete(self, *keys):
+        self.deleted.extend(keys)
+        await super().delete(*keys)
+
+
+@pytest.fixture
+def backend():
+    previous, account_cache.backend = account_cache._backend, StandInBackend()
+    yield account_cache.backend
+    account_cache.backend = previous
+
+
+async def setup_user(email: str) -> int:
+    async with get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with get_db() as session:
+        user = User(email=email, password_hash="x", first_name="A", last_name="B")
+        session.add(user)
+        await session.flush()
+        return user.id
+
+
+async def list_accounts(user_id: int):
+    async with get_db() as session:
+        return await AccountService.get_user_accounts(session, user_id)
+
+
+def test_listing_is_cached_and_invalidated_after_writes(backend):
+    async def run():
+        user_id = await setup_user("cache@test.com")
+        async with get_db() as session:
+            account = await AccountService.create_account(session, user_id, "CHECKING")
+        assert backend.deleted == [f"accounts:{user_id}"]
+
+        hits = account_cache.hits
+        first = await list_accounts(user_id)
+        assert await list_accounts(user_id) == first
+        assert account_cache.hits == hits + 1
+
+        async with get_db() as session:
+            await PostingService.post(session, account.id, "25.00", "DEPOSIT", user_id=user_id)
+        assert backend.deleted[-1] == f"accounts:{user_id}"
+        balances = [a["balance"] for a in await list_accounts(user_id)]
+        await dispose_engine()
+        return first, balances
+
+    first, balances = asyncio.run(run())
+    assert [a["balance"] for a in first] == ["0.00"]
+    assert balances == ["25.00"]
+
+
+def test_failed_transaction_keeps_the_cached_listing(backend):
+    async def run():
+        user_id = await setup_user("rollback@test.com")
+        async with get_db() as session:
+            account = await AccountService.create_account(session, user_id, "SAVINGS")
+        await list_accounts(user_id)
+        deleted = len(backend.deleted)
+        with pytest.raises(Exception):
+            async with get_db() as session:
+                await PostingService.post(session, account.id, "10.00", "WITHDRAWAL", user_id=user_id)
+        await dispose_engine()
+        return len(backend.deleted) - deleted
+
+    assert asyncio.run(run()) == 0
@@ -0,0 +1,74 @@
+import asyncio
+import json
+import threading
+
+from app.Filteragent import TextFilterAgent
+
+
+def reply_for(prompt: str) -> str:
+    """Stub LLM : INGEST pour les textes contenant « Oracle », SKIP sinon"""
+    items = json.loads(prompt.split("TEXTS:\n", 1)[1].split("\n\nOUTPUT", 1)[0])
+    return json.dumps([{"index": item["index"], "decision": "INGEST" if "Oracle" in item["text"] else "SKIP",
+                        "reason": ""} for item in items])
+
+
+class AsyncStubLLM:
+    def __init__(self):
+        self.running = self.peak = 0
+
+    async def __call__(self, prompt: str) -> str:
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return reply_for(prompt)
+
+
+TEXTS = [f"Oracle AWR section {i}" if i % 2 else f"Table of contents {i}" for i in range(40)]
+
+
+def test_filter_async_with_async_callable_object(tmp_path):
+    llm = AsyncStubLLM()
+    agent = TextFilterAgent(llm=llm, batch_size=4, max_concurrency=3, cache_path=str(tmp_path / "decisions.jsonl"))
+
+    decisions = asyncio.run(agent.filter_async(TEXTS))
+
+    assert [d["decision"] for d in decisions] == ["INGEST" if i % 2 else "SKIP" for i in range(40)]
+    assert agent.llm_calls == 10
+    assert 1 < llm.peak <= 3
+
+
+def test_filter_async_with_sync_llm_runs_off_the_loop():
+    threads = set()
+
+    def llm(prompt):
+        threads.add(threading.current_thread())
+        return reply_for(prompt)
+
+    decisions = asyncio.run(TextFilterAgent(llm=llm, batch_size=8).filter_async(TEXTS))
+    assert len(decisions) == 40
+    assert threading.main_thread() not in threads
+
+
+def test_decision_file_is_complete_and_reloaded(tmp_path):
+    path = str(tmp_path / "decisions.jsonl")
+    agent = TextFilterAgent(llm=AsyncStubLLM(), batch_size=3, max_concurrency=8, cache_path=path)
+    asyncio.run(agent.filter_async(TEXTS))
+
+    with open(path, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f]
+    assert len(entries) == len({entry["key"] for entry in entries}) == 40
+
+    reloaded = TextFilterAgent(llm=reply_for, cache_path=path)
+    assert reloaded.filter_batch(TEXTS) == agent.filter_batch(TEXTS)
+    assert reloaded.llm_calls == 0
+
+
+def test_filter_batch_skips_cached_and_duplicate_texts():
+    agent = TextFilterAgent(llm=reply_for, batch_size=5)
+    agent.filter_batch(TEXTS[:10])
+    assert agent.llm_calls == 2
+
+    decisions = agent.filter_batch(TEXTS[:10] + TEXTS[:10] + TEXTS[10:15])
+    assert len(decisions) == 25
+    assert agent.llm_calls == 3
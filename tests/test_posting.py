@@ -0,0 +1,27 @@
+import pytest
+from pydantic import ValidationError
+from sanic.exceptions import BadRequest
+
+from app.api.schemas import TransactionCreateRequest
+from app.services.posting_service import PostingService
+from app.utils.exceptions import InvalidAmount
+
+
+@pytest.mark.parametrize("amount", ["0.001", "1.005", "0", "-1", "10000000000.00", "abc"])
+def test_invalid_amounts_are_rejected(amount):
+    with pytest.raises(InvalidAmount):
+        PostingService.to_amount(amount)
+
+
+def test_destination_is_rejected_for_non_transfers():
+    with pytest.raises(ValidationError):
+        TransactionCreateRequest(amount=5, transaction_type="DEPOSIT", to_account_id=2)
+    with pytest.raises(ValidationError):
+        TransactionCreateRequest(amount=5, transaction_type="WITHDRAWAL", to_account_number="FR7630001007940000000000148")
+    with pytest.raises(BadRequest):
+        PostingService.compute_deltas(1, 5, "DEPOSIT", to_account_id=2)
+
+
+def test_transfer_deltas():
+    assert PostingService.compute_deltas(1, 5, "TRANSFER", to_account_id=2) == {1: -5, 2: 5}
+    assert TransactionCreateRequest(amount=5, transaction_type="TRANSFER", to_account_id=2).to_account_id == 2
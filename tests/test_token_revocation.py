@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+from sanic.exceptions import Unauthorized
+
+from app.core import security
+from app.core.cache import MemoryBackend
+
+
+def test_memory_backend_keeps_unexpired_entries_past_maxsize():
+    backend = MemoryBackend(maxsize=10, ttl=60, evict_live=False)
+
+    async def run():
+        for i in range(50):
+            await backend.set(f"token:{i}", 1)
+        await backend.set("expired", 1, ttl=-1)
+        return await backend.get_many(*(f"token:{i}" for i in range(50)))
+
+    assert all(value == 1 for value in asyncio.run(run()))
+
+
+def test_revoked_token_is_rejected_and_counted():
+    token = security.create_access_token(42)
+    revocations = security.token_cache.revocations
+
+    async def run():
+        assert await security.authenticate(token) == 42
+        hits = revocations.hits
+        await security.revoke_token(token)
+        with pytest.raises(Unauthorized):
+            await security.authenticate(token)
+        return revocations.hits - hits
+
+    assert asyncio.run(run()) == 1
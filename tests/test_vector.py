@@ -0,0 +1,73 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.Vector import SQLiteVectorBackend, VectorStoreWriter, as_float32
+
+
+class TrackingConnection:
+    """Enveloppe d'une connexion sqlite3 : mesure les transactions simultanées"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.active = self.peak = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        return self.conn.__enter__()
+
+    def __exit__(self, *exc):
+        try:
+            return self.conn.__exit__(*exc)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def executemany(self, *args):
+        time.sleep(0.002)  # élargit la fenêtre de chevauchement
+        return self.conn.executemany(*args)
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+
+def rows(count: int, dimensions: int = 16):
+    for i in range(count):
+        yield f"chunk {i}", np.full(dimensions, i, dtype=np.float32)
+
+
+def test_concurrent_writes_are_serialized_and_complete():
+    backend = SQLiteVectorBackend()
+    backend.conn = tracking = TrackingConnection(backend.conn)
+    with VectorStoreWriter(backend, batch_size=50, concurrency=8) as writer:
+        assert writer.write(rows(5000)) == 5000
+        contents, matrix = backend.fetch()
+
+    assert tracking.peak == 1
+    assert matrix.shape == (5000, 16)
+    assert sorted(matrix[:, 0].astype(int).tolist()) == list(range(5000))
+    assert sorted(contents) == sorted(f"chunk {i}" for i in range(5000))
+
+
+def test_write_streams_in_batches_and_counts_per_call():
+    backend = SQLiteVectorBackend()
+    writer = VectorStoreWriter(backend, batch_size=7)
+    assert writer.write(rows(20)) == 20
+    assert writer.write(rows(5)) == 5
+    assert writer.written == 25
+
+
+def test_dimension_mismatch_is_rejected():
+    writer = VectorStoreWriter(SQLiteVectorBackend(), batch_size=10, dimensions=16)
+    with pytest.raises(ValueError):
+        writer.write([("a", np.zeros(16)), ("b", np.zeros(8))])
+
+
+def test_as_float32_from_numpy_and_list():
+    assert as_float32(np.arange(3, dtype=np.float64)).tolist() == [0.0, 1.0, 2.0]
+    assert as_float32([1, 2]).typecode == "f"
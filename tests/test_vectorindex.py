@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from app.Vectorindex import LocalVectorStore
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_filtered_search_with_duplicate_vectors(tmp_path, seed):
+    """Embeddings en double : build_ivf laisse des partitions vides, la recherche filtrée doit rester possible"""
+    rng = np.random.default_rng(seed)
+    store = LocalVectorStore(str(tmp_path), dimensions=8, nprobe=1)
+    vector = rng.normal(size=8)
+    store.insert_docs([("t", [], "s", f"chunk {i}", vector) for i in range(23)])
+    store.build_ivf(seed=seed)
+
+    hits = store.search(rng.normal(size=8), top_k=5, topic="t")[0]
+    assert len(hits) == 5
+    assert {doc_id for doc_id, _ in hits} <= set(range(23))
+
+
+def test_ivf_probes_only_non_empty_partitions(tmp_path):
+    rng = np.random.default_rng(0)
+    store = LocalVectorStore(str(tmp_path), dimensions=8, nprobe=2)
+    vectors = np.repeat(rng.normal(size=(3, 8)), 10, axis=0)
+    store.insert_docs([("t", [], "s", f"chunk {i}", v) for i, v in enumerate(vectors)])
+    store.build_ivf(nlist=6)
+
+    ranges = store._candidates(np.atleast_2d(vectors[0]), 2)
+    assert len(ranges) == 2
+    assert all(end > start for start, end in ranges)